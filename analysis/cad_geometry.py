@@ -0,0 +1,372 @@
+"""CAD model of the BABY assembly.
+
+baby_dimensions() is the parametric definition of the assembly shared by the
+CSG model (openmc_model.baby_geometry), the DAGMC model and the UM_TBR mesh
+(mesh_creation.py). The ClLiF is built in gmsh OCC by add_cllif, used by
+both the DAGMC model and mesh_creation.py. The DAGMC model (vessel,
+insulation, crucible, ClLiF, heater and helium) is meshed on its surfaces
+and written to a h5m file with pymoab. gmsh and pymoab are only needed to
+build the file, which is cached on disk by dimensions and mesh options.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = Path(__file__).parent / ".cache" / "dagmc"
+
+# BABY coordinates in the Nuclear Vault
+BABY_CENTER = (587, 60, 100)  # cm
+
+# nominal values of the adjustable dimensions of the assembly (cm)
+NOMINAL_DIMENSIONS = {
+    "cllif_thickness": 6.388 + 0.13022,  # without heater: 0.1081
+    "cllif_radius": 7.00,
+    "heater_r": 0.439,
+    "heater_h": 25.40,
+    "heater_gap": 0.878,
+}
+
+# volumes of the DAGMC model, in the order they are built
+VOLUMES = ("heater", "cllif", "gap", "cap", "alumina", "firebrick", "vessel", "he")
+
+
+def baby_dimensions(
+    cllif_thickness: float = NOMINAL_DIMENSIONS["cllif_thickness"],
+    cllif_radius: float = NOMINAL_DIMENSIONS["cllif_radius"],
+    heater_r: float = NOMINAL_DIMENSIONS["heater_r"],
+    heater_h: float = NOMINAL_DIMENSIONS["heater_h"],
+    heater_gap: float = NOMINAL_DIMENSIONS["heater_gap"],
+) -> dict:
+    """Returns the dimensions of the BABY assembly, shared by the CSG model
+    (openmc_model.baby_geometry), the DAGMC model and the UM_TBR mesh
+    (mesh_creation.py).
+
+    Args:
+        cllif_thickness: height of the ClLiF salt (cm)
+        cllif_radius: radius of the ClLiF salt (cm)
+        heater_r: radius of the heater (cm)
+        heater_h: height of the heater (cm)
+        heater_gap: gap between the bottom of the heater and the bottom of
+            the ClLiF (cm)
+
+    Returns:
+        dict of thicknesses and radii (cm), with the heights of the 13
+        z-planes ("z_planes") and of the bottom of the heater ("heater_z")
+        above the bottom of the epoxy base
+    """
+    dims = {
+        "epoxy_thickness": 1.905,  # before was 2.54 cm = 1 inch
+        "alumina_compressed_thickness": 2.54,  # 1 inch
+        "base_thickness": 0.786,
+        "alumina_thickness": 0.635,
+        "he_thickness": 0.6,
+        "inconel_thickness": 0.3,
+        "heater_gap": heater_gap,
+        "cllif_thickness": cllif_thickness,
+        "gap_thickness": 4.605,
+        "cap": 1.422,
+        "firebrick_thickness": 15.24,
+        "high": 21.093,
+        "cover": 2.392,
+        "heater_r": heater_r,
+        "heater_h": heater_h,
+        "cllif_radius": cllif_radius,
+        "inconel_radius": 7.3,
+        "he_radius": 9.144,
+        "firebrick_radius": 12.002,
+        "vessel_radius": 12.853,
+        "external_radius": 13.272,
+    }
+
+    z_1 = 0.0
+    z_2 = z_1 + dims["epoxy_thickness"]
+    z_3 = z_2 + dims["alumina_compressed_thickness"]
+    z_4 = z_3 + dims["base_thickness"]
+    z_5 = z_4 + dims["alumina_thickness"]
+    z_6 = z_5 + dims["he_thickness"]
+    z_7 = z_6 + dims["inconel_thickness"]
+    z_8 = z_7 + dims["cllif_thickness"]
+    z_9 = z_8 + dims["gap_thickness"]
+    z_10 = z_9 + dims["cap"]
+    z_11 = z_5 + dims["firebrick_thickness"]
+    z_12 = z_4 + dims["high"]
+    z_13 = z_12 + dims["cover"]
+    dims["z_planes"] = [
+        z_1,
+        z_2,
+        z_3,
+        z_4,
+        z_5,
+        z_6,
+        z_7,
+        z_8,
+        z_9,
+        z_10,
+        z_11,
+        z_12,
+        z_13,
+    ]
+    dims["heater_z"] = z_7 + dims["heater_gap"]
+
+    return dims
+
+
+def add_cllif(dims: dict, x: float = 0.0, y: float = 0.0, z: float = 0.0) -> list:
+    """Adds the ClLiF, a cylinder with the heater hole, to the current gmsh
+    model.
+
+    Args:
+        dims: dimensions of the assembly (see baby_dimensions)
+        x: x-coordinate of the axis of the assembly (cm)
+        y: y-coordinate of the axis of the assembly (cm)
+        z: z-coordinate of the bottom of the epoxy base (cm)
+
+    Returns:
+        the (dim, tag) of the ClLiF volumes
+    """
+    import gmsh
+
+    z_7, z_8 = dims["z_planes"][6:8]
+    cllif = gmsh.model.occ.addCylinder(
+        x, y, z + z_7, 0, 0, dims["cllif_thickness"], dims["cllif_radius"]
+    )
+    # the hole goes down from the top of the ClLiF to the bottom of the heater
+    hole = gmsh.model.occ.addCylinder(
+        x, y, z + z_8, 0, 0, -(z_8 - dims["heater_z"]), dims["heater_r"]
+    )
+    out, _ = gmsh.model.occ.cut([(3, cllif)], [(3, hole)])
+    return out
+
+
+def _cylinder(radius: float, z_low: float, z_high: float) -> tuple:
+    import gmsh
+
+    tag = gmsh.model.occ.addCylinder(0, 0, z_low, 0, 0, z_high - z_low, radius)
+    return (3, tag)
+
+
+def _cut(solid: tuple, tools: list) -> list:
+    import gmsh
+
+    out, _ = gmsh.model.occ.cut([solid], tools)
+    return out
+
+
+def _build_volumes(dims: dict, padding: float) -> dict:
+    """Builds the volumes of the assembly in the current gmsh model, with
+    the bottom of the epoxy base at z = 0 and the axis at x = y = 0.
+
+    Returns:
+        dict {volume name: list of gmsh volume tags}
+    """
+    import gmsh
+
+    z = dims["z_planes"]
+    z_3, z_4, z_5, z_6, z_7, z_8, z_9, z_10, z_11, z_12, z_13 = z[2:]
+    heater_r = dims["heater_r"]
+    heater_z = dims["heater_z"]
+    heater_top = min(heater_z + dims["heater_h"], z_13 + padding)
+
+    def heater():
+        return _cylinder(heater_r, heater_z, heater_top)
+
+    def firebrick():
+        return _cut(
+            _cylinder(dims["firebrick_radius"], z_5, z_11),
+            [_cylinder(dims["he_radius"], z_5, z_11)],
+        )
+
+    shapes = {
+        "heater": [heater()],
+        "cllif": add_cllif(dims),
+        "gap": _cut(_cylinder(dims["cllif_radius"], z_8, z_9), [heater()]),
+        "cap": _cut(
+            _cylinder(dims["inconel_radius"], z_6, z_10),
+            [_cylinder(dims["cllif_radius"], z_7, z_9), heater()],
+        ),
+        "alumina": [_cylinder(dims["vessel_radius"], z_4, z_5)],
+        "firebrick": firebrick(),
+        # the outer surfaces are padded so that their facets stay outside of
+        # the CSG cell clipping the universe
+        "vessel": _cut(
+            _cylinder(dims["external_radius"] + padding, z_3 - padding, z_13 + padding),
+            [_cylinder(dims["vessel_radius"], z_4, z_12), heater()],
+        ),
+        "he": _cut(
+            _cylinder(dims["vessel_radius"], z_5, z_12),
+            [_cylinder(dims["inconel_radius"], z_6, z_10), *firebrick(), heater()],
+        ),
+    }
+
+    # fragment the volumes so that touching volumes share their surfaces
+    names = [name for name in VOLUMES for _ in shapes[name]]
+    solids = [solid for name in VOLUMES for solid in shapes[name]]
+    _, out_map = gmsh.model.occ.fragment(solids[:1], solids[1:])
+    gmsh.model.occ.synchronize()
+
+    volumes = {name: [] for name in VOLUMES}
+    for name, fragments in zip(names, out_map):
+        volumes[name] += [tag for dim, tag in fragments if dim == 3]
+    return volumes
+
+
+def _write_h5m(filename, volumes: dict, material_names: dict):
+    """Writes the surface mesh of the current gmsh model to a DAGMC file.
+
+    Args:
+        filename: path of the h5m file
+        volumes: dict {volume name: list of gmsh volume tags}
+        material_names: dict {volume name: material name}
+    """
+    import gmsh
+    from pymoab import core, types
+
+    mbc = core.Core()
+    geom_dimension = mbc.tag_get_handle(
+        types.GEOM_DIMENSION_TAG_NAME,
+        1,
+        types.MB_TYPE_INTEGER,
+        types.MB_TAG_DENSE,
+        create_if_missing=True,
+    )
+    category = mbc.tag_get_handle(
+        types.CATEGORY_TAG_NAME,
+        types.CATEGORY_TAG_SIZE,
+        types.MB_TYPE_OPAQUE,
+        types.MB_TAG_SPARSE,
+        create_if_missing=True,
+    )
+    name_tag = mbc.tag_get_handle(
+        types.NAME_TAG_NAME,
+        types.NAME_TAG_SIZE,
+        types.MB_TYPE_OPAQUE,
+        types.MB_TAG_SPARSE,
+        create_if_missing=True,
+    )
+    global_id = mbc.tag_get_handle(types.GLOBAL_ID_TAG_NAME)
+    surface_sense = mbc.tag_get_handle(
+        "GEOM_SENSE_2",
+        2,
+        types.MB_TYPE_HANDLE,
+        types.MB_TAG_SPARSE,
+        create_if_missing=True,
+    )
+
+    # the vertices are shared by all the surfaces, so the model is watertight
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    vertices = np.fromiter(mbc.create_vertices(coords), dtype=np.uint64)
+    vertex_index = np.zeros(int(node_tags.max()) + 1, dtype=np.int64)
+    vertex_index[node_tags.astype(np.int64)] = np.arange(len(node_tags))
+
+    surface_sets = {}
+    for _, surface in gmsh.model.getEntities(2):
+        surface_set = mbc.create_meshset()
+        mbc.tag_set_data(geom_dimension, surface_set, 2)
+        mbc.tag_set_data(category, surface_set, "Surface")
+        mbc.tag_set_data(global_id, surface_set, surface)
+        element_types, _, element_nodes = gmsh.model.mesh.getElements(2, surface)
+        for element_type, nodes in zip(element_types, element_nodes):
+            if element_type != 2:  # 3-node triangles
+                continue
+            connectivity = vertices[vertex_index[nodes.astype(np.int64)]]
+            triangles = mbc.create_elements(types.MBTRI, connectivity.reshape(-1, 3))
+            mbc.add_entities(surface_set, triangles)
+            mbc.add_entities(surface_set, np.unique(connectivity))
+        surface_sets[surface] = surface_set
+
+    senses = {surface: [0, 0] for surface in surface_sets}
+    volume_sets = {}
+    for volume_id, (name, tag) in enumerate(
+        ((name, tag) for name in VOLUMES for tag in volumes[name]), start=1
+    ):
+        volume_set = mbc.create_meshset()
+        mbc.tag_set_data(geom_dimension, volume_set, 3)
+        mbc.tag_set_data(category, volume_set, "Volume")
+        mbc.tag_set_data(global_id, volume_set, volume_id)
+        # the surface normals point out of the volume with a positive sign
+        for _, surface in gmsh.model.getBoundary(
+            [(3, tag)], combined=False, oriented=True
+        ):
+            mbc.add_parent_child(volume_set, surface_sets[abs(surface)])
+            senses[abs(surface)][0 if surface > 0 else 1] = volume_set
+        volume_sets.setdefault(material_names[name], []).append(volume_set)
+
+    for surface, surface_set in surface_sets.items():
+        mbc.tag_set_data(
+            surface_sense, surface_set, np.array(senses[surface], dtype=np.uint64)
+        )
+
+    for material_name, sets in volume_sets.items():
+        group_set = mbc.create_meshset()
+        mbc.tag_set_data(category, group_set, "Group")
+        mbc.tag_set_data(name_tag, group_set, f"mat:{material_name}")
+        mbc.add_entities(group_set, sets)
+
+    mbc.write_file(str(filename))
+
+
+def dagmc_file(
+    dims: dict,
+    material_names: dict,
+    mesh_size: float = 1.0,
+    elements_per_circle: int = 72,
+    padding: float = 0.1,
+    cache_dir=None,
+) -> Path:
+    """Returns the DAGMC file of the BABY assembly, built with gmsh if it is
+    not cached yet.
+
+    Args:
+        dims: dimensions of the assembly (see baby_dimensions)
+        material_names: dict {volume name: material name} for all the
+            VOLUMES, the names must match the openmc materials
+        mesh_size: maximum size of the surface triangles (cm)
+        elements_per_circle: number of triangles around the cylinders
+        padding: distance between the outer surfaces of the vessel and the
+            CSG cell containing the assembly (cm)
+        cache_dir: directory of the cached files (defaults to CACHE_DIR)
+
+    Returns:
+        the absolute path of the h5m file
+    """
+    missing = set(VOLUMES) - set(material_names)
+    if missing:
+        raise ValueError(f"No material given for the volumes {sorted(missing)}")
+
+    key = json.dumps(
+        {
+            "dims": dims,
+            "materials": {name: material_names[name] for name in VOLUMES},
+            "mesh_size": mesh_size,
+            "elements_per_circle": elements_per_circle,
+            "padding": padding,
+        },
+        sort_keys=True,
+    )
+    cache_dir = Path(cache_dir if cache_dir is not None else CACHE_DIR).resolve()
+    filename = cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.h5m"
+    if filename.exists():
+        return filename
+
+    import gmsh
+
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    gmsh.initialize()
+    try:
+        gmsh.option.setNumber("General.Terminal", 0)
+        gmsh.model.add("baby")
+        volumes = _build_volumes(dims, padding)
+        gmsh.option.setNumber("Mesh.MeshSizeMax", mesh_size)
+        gmsh.option.setNumber("Mesh.MeshSizeFromCurvature", elements_per_circle)
+        gmsh.model.mesh.generate(2)
+        # write to a temporary file so that an interrupted build is not cached
+        partial = filename.with_suffix(".partial.h5m")
+        _write_h5m(partial, volumes, material_names)
+        partial.replace(filename)
+    finally:
+        gmsh.finalize()
+
+    return filename
@@ -0,0 +1,198 @@
+import numpy as np
+from scipy.special import erf
+
+# incident neutron energy bins of the detector spectrum tallies (eV)
+ENERGY_BINS = np.linspace(0.0, 16.0e6, 321)
+
+# deposited energy channels of the diamond detector (eV)
+CHANNEL_EDGES = np.linspace(0.0, 16.0e6, 801)
+
+C12_MASS_RATIO = 11.8969  # mass of C12 / mass of the neutron
+C12_N_ALPHA_Q = -5.702e6  # Q-value of C12(n,a)Be9 (eV)
+
+DIAMOND_SPECTRUM_TALLY = "diamond_spectrum"
+
+
+def _gaussian_cdf(x, sigma):
+    return 0.5 * (1 + erf(x / (np.sqrt(2) * sigma)))
+
+
+def _box_gaussian_cdf(x, width, sigma):
+    """CDF of a uniform distribution on [0, width] convolved with a gaussian
+    of standard deviation sigma."""
+
+    def integral(u):
+        return u * _gaussian_cdf(u, sigma) + sigma**2 * np.exp(
+            -0.5 * (u / sigma) ** 2
+        ) / (np.sqrt(2 * np.pi) * sigma)
+
+    return (integral(x) - integral(x - width)) / width
+
+
+class DiamondResponse:
+    """Response of the diamond detector to a neutron spectrum.
+
+    The response matrices give, for each incident energy bin, the probability
+    of depositing energy in each channel for the two reactions dominating the
+    diamond detector signal:
+
+    - elastic scattering on C12: the recoil energy is uniform between 0 and
+      4A/(1+A)^2 E (isotropic scattering in the centre of mass)
+    - C12(n,a)Be9: the alpha and Be9 deposit E + Q
+
+    both broadened by a gaussian energy resolution. The matrices are computed
+    once and then folded with any number of tallied spectra.
+
+    Args:
+        energy_bins: incident neutron energy bin edges (eV)
+        channel_edges: deposited energy channel edges (eV)
+        fwhm: full width at half maximum of the energy resolution (eV)
+        subdivisions: number of energies sampled in each incident bin
+    """
+
+    def __init__(
+        self,
+        energy_bins=ENERGY_BINS,
+        channel_edges=CHANNEL_EDGES,
+        fwhm: float = 100e3,
+        subdivisions: int = 10,
+    ):
+        self.energy_bins = np.asarray(energy_bins, dtype=float)
+        self.channel_edges = np.asarray(channel_edges, dtype=float)
+        self.fwhm = fwhm
+        sigma = fwhm / (2 * np.sqrt(2 * np.log(2)))
+
+        # energies sampled in each incident bin, shape (n_energies, subdivisions)
+        fractions = (np.arange(subdivisions) + 0.5) / subdivisions
+        low, high = self.energy_bins[:-1], self.energy_bins[1:]
+        energies = low[:, None] + (high - low)[:, None] * fractions[None, :]
+        edges = self.channel_edges[:, None, None]
+
+        # elastic recoils
+        recoil_max = 4 * C12_MASS_RATIO / (1 + C12_MASS_RATIO) ** 2 * energies
+        recoil_max = np.maximum(recoil_max, 1e-12)
+        cdf = _box_gaussian_cdf(edges, recoil_max[None], sigma)
+        self.elastic_matrix = np.diff(cdf, axis=0).mean(axis=-1)
+
+        # C12(n,a)Be9, zero below threshold
+        deposited = energies + C12_N_ALPHA_Q
+        threshold = -C12_N_ALPHA_Q * (C12_MASS_RATIO + 1) / C12_MASS_RATIO
+        cdf = _gaussian_cdf(edges - deposited[None], sigma)
+        cdf = np.where(energies[None] > threshold, cdf, 0.0)
+        self.n_alpha_matrix = np.diff(cdf, axis=0).mean(axis=-1)
+
+    @property
+    def channels(self) -> np.ndarray:
+        """Centres of the deposited energy channels (eV)"""
+        return 0.5 * (self.channel_edges[1:] + self.channel_edges[:-1])
+
+    def fold(self, elastic, n_alpha, source_rate: float = 1.0) -> np.ndarray:
+        """Folds reaction rate spectra into a count rate spectrum.
+
+        Args:
+            elastic: elastic reaction rates per incident energy bin, shape
+                (..., n_energies), for instance (n_batches, n_energies) or
+                (n_runs, n_energies) (reactions per source neutron)
+            n_alpha: (n,a) reaction rates, same shape as elastic
+            source_rate: neutron emission rate of the generator (n/s)
+
+        Returns:
+            the count rate per channel, shape (..., n_channels)
+        """
+        elastic = np.asarray(elastic, dtype=float)
+        n_alpha = np.asarray(n_alpha, dtype=float)
+        counts = np.einsum("...e,ce->...c", elastic, self.elastic_matrix)
+        counts += np.einsum("...e,ce->...c", n_alpha, self.n_alpha_matrix)
+        return source_rate * counts
+
+    def fold_std(self, elastic_std, n_alpha_std, source_rate: float = 1.0):
+        """Propagates the standard deviations of the reaction rates (assumed
+        uncorrelated between energy bins) to the count rate spectrum.
+
+        Args:
+            elastic_std: standard deviations of the elastic rates
+            n_alpha_std: standard deviations of the (n,a) rates
+            source_rate: neutron emission rate of the generator (n/s)
+
+        Returns:
+            the standard deviation of the count rate per channel
+        """
+        elastic_var = np.asarray(elastic_std, dtype=float) ** 2
+        n_alpha_var = np.asarray(n_alpha_std, dtype=float) ** 2
+        var = np.einsum("...e,ce->...c", elastic_var, self.elastic_matrix**2)
+        var += np.einsum("...e,ce->...c", n_alpha_var, self.n_alpha_matrix**2)
+        return source_rate * np.sqrt(var)
+
+    def predict(self, statepoint, source_rate: float = 1.0):
+        """Predicts the count rate spectrum from a statepoint of baby_model
+        run with detector_tallies=True.
+
+        Args:
+            statepoint: the openmc.StatePoint
+            source_rate: neutron emission rate of the generator (n/s)
+
+        Returns:
+            the count rate and its standard deviation per channel
+        """
+        tally = statepoint.get_tally(name=DIAMOND_SPECTRUM_TALLY)
+        values = {}
+        for score in ["elastic", "(n,a)"]:
+            for value in ["mean", "std_dev"]:
+                values[score, value] = tally.get_values(
+                    scores=[score], value=value
+                ).ravel()
+
+        counts = self.fold(
+            values["elastic", "mean"], values["(n,a)", "mean"], source_rate
+        )
+        std = self.fold_std(
+            values["elastic", "std_dev"], values["(n,a)", "std_dev"], source_rate
+        )
+        return counts, std
+
+
+def rebin_measurement(channel_edges, measured_edges, measured_counts):
+    """Rebins a measured spectrum onto the response channels assuming the
+    counts are uniform within each measured bin.
+
+    Args:
+        channel_edges: edges of the response channels (eV)
+        measured_edges: edges of the measured bins (eV)
+        measured_counts: counts in the measured bins, shape (..., n_bins)
+
+    Returns:
+        the counts in the response channels
+    """
+    measured_counts = np.asarray(measured_counts, dtype=float)
+    cumulative = np.concatenate(
+        [np.zeros(measured_counts.shape[:-1] + (1,)), np.cumsum(measured_counts, -1)],
+        axis=-1,
+    )
+    interpolated = np.apply_along_axis(
+        lambda c: np.interp(channel_edges, measured_edges, c), -1, cumulative
+    )
+    return np.diff(interpolated, axis=-1)
+
+
+def chi_square(predicted, predicted_std, measured, measured_std=None):
+    """Computes the chi square between predicted and measured spectra,
+    vectorized over the leading axes (eg. runs of a parameter sweep).
+
+    Args:
+        predicted: predicted count rates, shape (..., n_channels)
+        predicted_std: standard deviations of the predicted count rates
+        measured: measured count rates, shape (n_channels,) or (..., n_channels)
+        measured_std: standard deviations of the measured count rates
+            (defaults to zero)
+
+    Returns:
+        the chi square, shape (...)
+    """
+    variance = np.asarray(predicted_std, dtype=float) ** 2
+    if measured_std is not None:
+        variance = variance + np.asarray(measured_std, dtype=float) ** 2
+    residuals = np.asarray(predicted, dtype=float) - np.asarray(measured, dtype=float)
+    terms = np.divide(
+        residuals**2, variance, out=np.zeros_like(residuals), where=variance > 0
+    )
+    return terms.sum(axis=-1)
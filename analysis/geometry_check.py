@@ -0,0 +1,306 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import openmc
+
+import helpers
+
+CACHE_DIR = Path(__file__).parent / ".cache"
+CACHE_FILE = CACHE_DIR / "geometry_check.json"
+
+
+def evaluate_surface(surface, points: np.ndarray) -> np.ndarray:
+    """Evaluates the surface equation f(x, y, z) at many points at once.
+
+    Args:
+        surface: the openmc surface
+        points: array of shape (N, 3)
+
+    Returns:
+        array of shape (N,) with the values of f
+    """
+    x, y, z = points[:, 0], points[:, 1], points[:, 2]
+    try:
+        coeffs = surface._get_base_coeffs()
+    except NotImplementedError:
+        coeffs = None
+
+    if coeffs is not None and len(coeffs) == 4:
+        # planes: ax + by + cz - d
+        a, b, c, d = coeffs
+        return a * x + b * y + c * z - d
+    if coeffs is not None and len(coeffs) == 10:
+        # quadrics: ax^2 + by^2 + cz^2 + dxy + eyz + fxz + gx + hy + jz + k
+        a, b, c, d, e, f, g, h, j, k = coeffs
+        return (
+            a * x**2
+            + b * y**2
+            + c * z**2
+            + d * x * y
+            + e * y * z
+            + f * x * z
+            + g * x
+            + h * y
+            + j * z
+            + k
+        )
+    # other surfaces (eg. tori) fall back to the scalar evaluation
+    return np.array([surface.evaluate(point) for point in points])
+
+
+def region_contains(region, points: np.ndarray, surface_values=None) -> np.ndarray:
+    """Checks which points are inside a region.
+
+    Args:
+        region: the openmc region (None means the whole space)
+        points: array of shape (N, 3)
+        surface_values: optional dict {surface id: values} used to evaluate
+            each surface only once across regions
+
+    Returns:
+        boolean array of shape (N,)
+    """
+    if surface_values is None:
+        surface_values = {}
+    if region is None:
+        return np.ones(len(points), dtype=bool)
+    if isinstance(region, openmc.Halfspace):
+        surface = region.surface
+        if surface.id not in surface_values:
+            surface_values[surface.id] = evaluate_surface(surface, points)
+        values = surface_values[surface.id]
+        return values > 0 if region.side == "+" else values < 0
+    if isinstance(region, openmc.Complement):
+        return ~region_contains(region.node, points, surface_values)
+    if isinstance(region, openmc.Intersection):
+        inside = np.ones(len(points), dtype=bool)
+        for node in region:
+            inside &= region_contains(node, points, surface_values)
+        return inside
+    if isinstance(region, openmc.Union):
+        inside = np.zeros(len(points), dtype=bool)
+        for node in region:
+            inside |= region_contains(node, points, surface_values)
+        return inside
+    raise TypeError(f"Unsupported region type {type(region).__name__}")
+
+
+def _check_points(cells: list, points: np.ndarray):
+    """Counts how many cells contain each point.
+
+    Returns:
+        the overlapping points with the IDs of the cells they belong to,
+        and the undefined points
+    """
+    surface_values = {}
+    membership = np.zeros((len(points), len(cells)), dtype=bool)
+    for i, cell in enumerate(cells):
+        membership[:, i] = region_contains(cell.region, points, surface_values)
+
+    counts = membership.sum(axis=1)
+    cell_ids = np.array([cell.id for cell in cells])
+    overlaps = [
+        (points[i].tolist(), cell_ids[membership[i]].tolist())
+        for i in np.flatnonzero(counts > 1)
+    ]
+    undefined = points[counts == 0].tolist()
+    return overlaps, undefined
+
+
+def sample_points(
+    cells: list, bounds, n_points: int, n_per_cell: int = 0, seed: int = 0
+) -> np.ndarray:
+    """Samples points uniformly in a box and in the bounding box of each cell.
+
+    Small cells (detectors, foils) are unlikely to be hit by a uniform
+    sampling of the whole domain, so n_per_cell extra points are sampled in
+    the bounding box of every cell that has a finite one.
+
+    Args:
+        cells: list of openmc.Cell
+        bounds: (lower_left, upper_right) of the domain
+        n_points: number of points sampled in the whole domain
+        n_per_cell: number of points sampled in each cell bounding box
+        seed: seed of the random number generator
+
+    Returns:
+        array of shape (N, 3)
+    """
+    rng = np.random.default_rng(seed)
+    lower_left, upper_right = (np.asarray(b, dtype=float) for b in bounds)
+    boxes = [(lower_left, upper_right, n_points)]
+
+    if n_per_cell > 0:
+        for cell in cells:
+            if cell.region is None:
+                continue
+            box_ll, box_ur = cell.region.bounding_box
+            box_ll = np.maximum(box_ll, lower_left)
+            box_ur = np.minimum(box_ur, upper_right)
+            if np.all(np.isfinite(box_ll)) and np.all(box_ur > box_ll):
+                boxes.append((box_ll, box_ur, n_per_cell))
+
+    return np.concatenate([rng.uniform(ll, ur, size=(n, 3)) for ll, ur, n in boxes])
+
+
+def check_geometry(
+    cells: list,
+    bounds,
+    n_points: int = int(1e6),
+    n_per_cell: int = int(1e4),
+    processes: int = None,
+    chunk_size: int = int(1e5),
+    seed: int = 0,
+    use_cache: bool = True,
+    max_reported: int = 10,
+):
+    """Checks that every point of a domain belongs to exactly one cell.
+
+    The points are split in chunks evaluated in parallel. If the check passes,
+    the result is cached by geometry hash and the next call with the same
+    geometry and at most as many points returns immediately.
+
+    Args:
+        cells: list of openmc.Cell expected to fill the domain
+        bounds: (lower_left, upper_right) of the domain
+        n_points: number of points sampled in the whole domain
+        n_per_cell: number of points sampled in each cell bounding box
+        processes: number of worker processes (defaults to the number of CPUs)
+        chunk_size: number of points per task
+        seed: seed of the random number generator
+        use_cache: if True, skip the check when it already passed for this
+            geometry with at least as many points
+        max_reported: maximum number of overlapping and undefined points kept
+            in the report
+
+    Returns:
+        dict with the keys "passed", "geometry_hash", "n_points", "overlaps",
+        "undefined" and "cached"
+    """
+    geometry_hash = helpers.geometry_hash(cells)
+    cache = _read_cache()
+    cached = cache.get(geometry_hash, {})
+    # a pass with fewer points (a quick check) does not replace this one
+    if (
+        use_cache
+        and cached.get("passed")
+        and cached.get("n_domain_points", 0) >= n_points
+        and cached.get("n_per_cell", 0) >= n_per_cell
+    ):
+        return dict(cached, overlaps=[], undefined=[], cached=True)
+
+    points = sample_points(cells, bounds, n_points, n_per_cell, seed)
+    chunks = np.array_split(points, max(1, len(points) // chunk_size))
+
+    overlaps, undefined = [], []
+    n_overlaps, n_undefined = 0, 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_check_points, cells, chunk) for chunk in chunks]
+        for future in futures:
+            chunk_overlaps, chunk_undefined = future.result()
+            n_overlaps += len(chunk_overlaps)
+            n_undefined += len(chunk_undefined)
+            overlaps += chunk_overlaps[: max_reported - len(overlaps)]
+            undefined += chunk_undefined[: max_reported - len(undefined)]
+
+    result = {
+        "passed": n_overlaps == 0 and n_undefined == 0,
+        "geometry_hash": geometry_hash,
+        "n_points": len(points),
+        "n_domain_points": n_points,
+        "n_per_cell": n_per_cell,
+        "n_overlaps": n_overlaps,
+        "n_undefined": n_undefined,
+        "time": time.time(),
+    }
+    if result["passed"]:
+        cache[geometry_hash] = result
+        _write_cache(cache)
+
+    return dict(result, overlaps=overlaps, undefined=undefined, cached=False)
+
+
+def _read_cache() -> dict:
+    if not CACHE_FILE.exists():
+        return {}
+    with open(CACHE_FILE) as f:
+        return json.load(f)
+
+
+def _write_cache(cache: dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(cache, f, indent=2)
+    tmp_file.replace(CACHE_FILE)
+
+
+def print_report(result: dict):
+    if result["cached"]:
+        print(
+            f"Geometry {result['geometry_hash']} already checked with "
+            f"{result['n_points']} points, skipping."
+        )
+        return
+    status = "passed" if result["passed"] else "FAILED"
+    print(
+        f"Geometry check {status} ({result['n_points']} points): "
+        f"{result['n_overlaps']} overlapping, {result['n_undefined']} undefined"
+    )
+    for point, cell_ids in result["overlaps"]:
+        print(f"  overlap at {point} in cells {cell_ids}")
+    for point in result["undefined"]:
+        print(f"  undefined point at {point}")
+
+
+def check_baby_geometry(dagmc: bool = False, **kwargs):
+    """Runs check_geometry on the cells of baby_geometry inside the
+    experimental lab domain.
+
+    Args:
+        dagmc: if True, checks the geometry with the DAGMC assembly. Only its
+            bounding cell is checked against the CSG cells, the volumes inside
+            the DAGMC universe share their surfaces by construction (see
+            cad_geometry.py)
+        kwargs: passed to check_geometry
+
+    Returns:
+        the result of check_geometry
+    """
+    from openmc_model import BABY_CENTER, baby_geometry
+
+    experimental_lab, *_, cells = baby_geometry(*BABY_CENTER, dagmc=dagmc)
+    bounds = (
+        (experimental_lab.xmin.x0, experimental_lab.ymin.y0, experimental_lab.zmin.z0),
+        (experimental_lab.xmax.x0, experimental_lab.ymax.y0, experimental_lab.zmax.z0),
+    )
+    return check_geometry(cells, bounds, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Checks the BABY geometry for overlaps and undefined regions"
+    )
+    parser.add_argument("--points", type=int, default=int(1e6))
+    parser.add_argument("--points-per-cell", type=int, default=int(1e4))
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="ignore the cache")
+    args = parser.parse_args()
+
+    result = check_baby_geometry(
+        n_points=args.points,
+        n_per_cell=args.points_per_cell,
+        processes=args.processes,
+        seed=args.seed,
+        use_cache=not args.force,
+    )
+    print_report(result)
+    if not result["passed"]:
+        raise SystemExit(1)
@@ -1,4 +1,6 @@
+import hashlib
 import math
+from pathlib import Path
 import openmc
 import numpy as np
 
@@ -32,3 +34,71 @@ def get_exp_cllif_density(temp, LiCl_frac=0.695):
 def calculate_cylinder_volume(radius, height):
     volume = math.pi * radius**2 * height
     return volume
+
+
+def material_key(material):
+    """Returns a short identifier of a material built from its name, density
+    and composition, so that it does not depend on the (auto-incremented)
+    material ID.
+    """
+    if material is None:
+        return "void"
+    if isinstance(material, openmc.DAGMCUniverse):
+        # the DAGMC files are named by the hash of their dimensions
+        return f"DAGMCUniverse-{Path(material.filename).stem}"
+    if not isinstance(material, openmc.Material):
+        return type(material).__name__
+    composition = ",".join(
+        f"{nuc.name}:{nuc.percent:.6e}{nuc.percent_type}"
+        for nuc in sorted(material.nuclides, key=lambda nuc: nuc.name)
+    )
+    digest = hashlib.sha256(
+        f"{material.density}{material.density_units}{composition}".encode()
+    ).hexdigest()[:8]
+    return f"{material.name}-{digest}"
+
+
+def _region_key(region):
+    """Returns a string describing a region with the surfaces spelled out by
+    type and coefficients instead of by ID."""
+    if region is None:
+        return "all"
+    if isinstance(region, openmc.Halfspace):
+        # exact coefficients: at vault coordinates the constant terms are
+        # ~1e5 and a few significant digits hide sub-millimetre changes
+        coeffs = ",".join(float(c).hex() for c in region.surface._get_base_coeffs())
+        return f"{region.side}{type(region.surface).__name__}[{coeffs}]"
+    if isinstance(region, openmc.Complement):
+        return f"~{_region_key(region.node)}"
+    operator = " | " if isinstance(region, openmc.Union) else " "
+    return "(" + operator.join(_region_key(node) for node in region) + ")"
+
+
+def _transform_key(cell):
+    """Returns a string describing the translation and rotation of a cell."""
+    return ";".join(
+        "none" if value is None else ",".join(float(v).hex() for v in np.ravel(value))
+        for value in [cell.translation, cell.rotation]
+    )
+
+
+def geometry_hash(cells):
+    """Calculates a hash of a list of cells from their regions, fills,
+    translations and rotations.
+
+    The hash only depends on the surface coefficients and on the materials
+    composition, not on the IDs, so rebuilding the same geometry in a new
+    session gives the same hash.
+
+    Args:
+        cells: iterable of openmc.Cell
+
+    Returns:
+        the hexadecimal hash (16 characters)
+    """
+    h = hashlib.sha256()
+    for cell in cells:
+        h.update(_region_key(cell.region).encode())
+        h.update(material_key(cell.fill).encode())
+        h.update(_transform_key(cell).encode())
+    return h.hexdigest()[:16]
@@ -1,157 +1,101 @@
 import openmc
 import argparse
+import inspect
+from pathlib import Path
 from libra_toolbox.neutronics import A325_generator_diamond, vault
+import cad_geometry
 import helpers
-
-
-def baby_geometry(x_c: float, y_c: float, z_c: float):
+import source_biasing
+from cad_geometry import BABY_CENTER, NOMINAL_DIMENSIONS, baby_dimensions
+from detector_response import DIAMOND_SPECTRUM_TALLY, ENERGY_BINS
+
+# unstructured mesh of the ClLiF used by the UM_TBR tally (see mesh_creation.py)
+UM_TBR_MESH = Path(__file__).resolve().parent.parent / "unstructured_mesh" / "baby.vtk"
+
+
+def baby_geometry(
+    x_c: float,
+    y_c: float,
+    z_c: float,
+    cllif_thickness: float = NOMINAL_DIMENSIONS["cllif_thickness"],
+    cllif_radius: float = NOMINAL_DIMENSIONS["cllif_radius"],
+    heater_r: float = NOMINAL_DIMENSIONS["heater_r"],
+    heater_h: float = NOMINAL_DIMENSIONS["heater_h"],
+    heater_gap: float = NOMINAL_DIMENSIONS["heater_gap"],
+    source_offset: float = 5.635,
+    detector_distance: float = 9.6,
+    cllif_material: openmc.Material = None,
+    dagmc: bool = False,
+):
     """Returns the geometry for the BABY experiment.
 
     Args:
         x_c: x-coordinate of the center of the BABY experiment (cm)
         y_c: y-coordinate of the center of the BABY experiment (cm)
         z_c: z-coordinate of the center of the BABY experiment (cm)
+        cllif_thickness: height of the ClLiF salt (cm)
+        cllif_radius: radius of the ClLiF salt, must be smaller than the
+            inconel crucible radius (7.3 cm)
+        heater_r: radius of the heater (cm)
+        heater_h: height of the heater (cm)
+        heater_gap: gap between the bottom of the heater and the bottom of
+            the ClLiF (cm)
+        source_offset: distance of the generator axis below z_c (cm)
+        detector_distance: distance of the diamond detector below the
+            generator axis (cm)
+        cllif_material: material of the salt (defaults to cllif_nat)
+        dagmc: if True, the assembly (vessel, insulation, crucible, ClLiF,
+            heater and helium) is a DAGMC universe tessellated by
+            cad_geometry.py instead of CSG cells (needs OpenMC built with
+            DAGMC, and gmsh and pymoab to build the file)
 
     Returns:
-        the sphere, cllif cell, and cells
+        the sphere, cllif cell (None if dagmc is True, the ClLiF is then a
+        volume of the DAGMC universe filled with cllif_material), and cells
     """
 
-    epoxy_thickness = 1.905  # before was 2.54 cm = 1 inch
-    alumina_compressed_thickness = 2.54  # 1 inch
-    base_thickness = 0.786
-    alumina_thickness = 0.635
-    he_thickness = 0.6
-    inconel_thickness = 0.3
-    heater_gap = 0.878
-    cllif_thickness = 6.388 + 0.13022  # without heater: 0.1081
-    gap_thickness = 4.605
-    cap = 1.422
-    firebrick_thickness = 15.24
-    high = 21.093
-    cover = 2.392
+    dims = baby_dimensions(
+        cllif_thickness, cllif_radius, heater_r, heater_h, heater_gap
+    )
+    epoxy_thickness = dims["epoxy_thickness"]
     z_tab = 28.00
     lead_height = 4.00
     lead_width = 8.00
     lead_length = 16.00
-    heater_r = 0.439
-    heater_h = 25.40
-    heater_z = (
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + inconel_thickness
-        + heater_gap
-        + z_c
-    )
-
-    cllif_radius = 7.00
-    inconel_radius = 7.3
-    he_radius = 9.144
-    firebrick_radius = 12.002
-    vessel_radius = 12.853
-    external_radius = 13.272
+    heater_z = dims["heater_z"] + z_c
 
     source_h = 50.00
     source_x = x_c - 13.50
-    source_z = z_c - 5.635
+    source_z = z_c - source_offset
     source_external_r = 5.00
     source_internal_r = 4.75
 
     ######## Surfaces #################
-    z_plane_1 = openmc.ZPlane(0.0 + z_c)
-    z_plane_2 = openmc.ZPlane(epoxy_thickness + z_c)
-    z_plane_3 = openmc.ZPlane(epoxy_thickness + alumina_compressed_thickness + z_c)
-    z_plane_4 = openmc.ZPlane(
-        epoxy_thickness + alumina_compressed_thickness + base_thickness + z_c
-    )
-    z_plane_5 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + z_c
-    )
-    z_plane_6 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + z_c
-    )
-    z_plane_7 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + inconel_thickness
-        + z_c
-    )
-    z_plane_8 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + inconel_thickness
-        + cllif_thickness
-        + z_c
-    )
-    z_plane_9 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + inconel_thickness
-        + cllif_thickness
-        + gap_thickness
-        + z_c
-    )
-    z_plane_10 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + he_thickness
-        + inconel_thickness
-        + cllif_thickness
-        + gap_thickness
-        + cap
-        + z_c
-    )
-    z_plane_11 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + alumina_thickness
-        + firebrick_thickness
-        + z_c
-    )
-    z_plane_12 = openmc.ZPlane(
-        epoxy_thickness + alumina_compressed_thickness + base_thickness + high + z_c
-    )
-    z_plane_13 = openmc.ZPlane(
-        epoxy_thickness
-        + alumina_compressed_thickness
-        + base_thickness
-        + high
-        + cover
-        + z_c
-    )
+    (
+        z_plane_1,
+        z_plane_2,
+        z_plane_3,
+        z_plane_4,
+        z_plane_5,
+        z_plane_6,
+        z_plane_7,
+        z_plane_8,
+        z_plane_9,
+        z_plane_10,
+        z_plane_11,
+        z_plane_12,
+        z_plane_13,
+    ) = [openmc.ZPlane(z + z_c) for z in dims["z_planes"]]
     z_plane_14 = openmc.ZPlane(z_c - z_tab)
     z_plane_15 = openmc.ZPlane(z_c - z_tab - epoxy_thickness)
 
     ######## Cylinder #################
-    z_cyl_1 = openmc.ZCylinder(x0=x_c, y0=y_c, r=cllif_radius)
-    z_cyl_2 = openmc.ZCylinder(x0=x_c, y0=y_c, r=inconel_radius)
-    z_cyl_3 = openmc.ZCylinder(x0=x_c, y0=y_c, r=he_radius)
-    z_cyl_4 = openmc.ZCylinder(x0=x_c, y0=y_c, r=firebrick_radius)
-    z_cyl_5 = openmc.ZCylinder(x0=x_c, y0=y_c, r=vessel_radius)
-    z_cyl_6 = openmc.ZCylinder(x0=x_c, y0=y_c, r=external_radius)
+    z_cyl_1 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["cllif_radius"])
+    z_cyl_2 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["inconel_radius"])
+    z_cyl_3 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["he_radius"])
+    z_cyl_4 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["firebrick_radius"])
+    z_cyl_5 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["vessel_radius"])
+    z_cyl_6 = openmc.ZCylinder(x0=x_c, y0=y_c, r=dims["external_radius"])
 
     right_cyl = openmc.model.RightCircularCylinder(
         (x_c, y_c, heater_z), heater_h, heater_r, axis="z"
@@ -191,7 +135,7 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
     dt_width = 0.8  # 8 mm
     dt_height = 0.4  # 4 mm
     z_dt_distance = (
-        source_z - 9.6
+        source_z - detector_distance
     )  # diamond detector was about 9.6 +/- 0.2 cm below the point source
 
     diamond_detect = openmc.model.RectangularParallelepiped(
@@ -306,20 +250,32 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
         & ~act_foils_zr_region
         & ~act_foils_nb_region
     )
+    if dagmc:
+        # the DAGMC universe fills the envelope of the vessel, the top of the
+        # heater stays a CSG cell
+        assembly_regions = [
+            +z_plane_3 & -z_plane_13 & -z_cyl_6,
+            -right_cyl & +z_plane_13,
+        ]
+    else:
+        assembly_regions = [
+            alumina_region,
+            cllif_region,
+            gap_region,
+            firebrick_region,
+            he_region,
+            vessel_region,
+            cap_region,
+            heater_region,
+        ]
+    assembly_exclusion = openmc.Intersection([~region for region in assembly_regions])
     sphere_region = (
         -sphere
         & ~source_wall_region
         & ~source_region
         & ~epoxy_region
         & ~alumina_compressed_region
-        & ~alumina_region
-        & ~cllif_region
-        & ~gap_region
-        & ~firebrick_region
-        & ~he_region
-        & ~vessel_region
-        & ~cap_region
-        & ~heater_region
+        & assembly_exclusion
         & ~table_under_source_region
         & ~lead_block_1_region
         & ~lead_block_2_region
@@ -340,18 +296,11 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
         & ~exp_source_region
         & ~lead_region
         & ~hdpe_region
-        & ~he_region
         & ~source_wall_region
         & ~source_region
         & ~epoxy_region
         & ~alumina_compressed_region
-        & ~alumina_region
-        & ~cllif_region
-        & ~gap_region
-        & ~firebrick_region
-        & ~vessel_region
-        & ~cap_region
-        & ~heater_region
+        & assembly_exclusion
         & ~table_under_source_region
         & ~lead_block_1_region
         & ~lead_block_2_region
@@ -376,7 +325,7 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
     alumina_cell = openmc.Cell(region=alumina_region)
     alumina_cell.fill = alumina
     cllif_cell = openmc.Cell(region=cllif_region)
-    cllif_cell.fill = cllif_nat  # cllif_nat or lithium_lead
+    cllif_cell.fill = cllif_material or cllif_nat  # cllif_nat or lithium_lead
     gap_cell = openmc.Cell(region=gap_region)
     gap_cell.fill = he
     cap_cell = openmc.Cell(region=cap_region)
@@ -445,6 +394,37 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
         exp_cell,
     ]
 
+    if dagmc:
+        material_names = {
+            "heater": heater_mat.name,
+            "cllif": cllif_cell.fill.name,
+            "gap": he.name,
+            "cap": inconel625.name,
+            "alumina": alumina.name,
+            "firebrick": firebrick.name,
+            "vessel": inconel625.name,
+            "he": he.name,
+        }
+        assembly = openmc.DAGMCUniverse(
+            cad_geometry.dagmc_file(dims, material_names), auto_geom_ids=True
+        )
+        # the DAGMC model is built with the bottom of the epoxy base at the
+        # origin
+        assembly_cell = openmc.Cell(region=assembly_regions[0], fill=assembly)
+        assembly_cell.translation = (x_c, y_c, z_c)
+        heater_cell.region = assembly_regions[1]
+        csg_assembly = [
+            vessel_cell,
+            alumina_cell,
+            cap_cell,
+            cllif_cell,
+            gap_cell,
+            firebrick_cell,
+            he_cell,
+        ]
+        cells = [assembly_cell] + [cell for cell in cells if cell not in csg_assembly]
+        cllif_cell = None
+
     return (
         experimental_lab,
         cllif_cell,
@@ -455,16 +435,49 @@ def baby_geometry(x_c: float, y_c: float, z_c: float):
     )
 
 
-def baby_model():
+def baby_model(
+    licl_frac: float = 0.695,
+    temperature: float = 650,
+    source_offset: float = 5.635,
+    source_bias: str = None,
+    detector_tallies: bool = False,
+    with_vault: bool = True,
+    um_tbr: bool = True,
+    dagmc: bool = False,
+    **geometry_params,
+):
     """Returns an openmc model of the BABY experiment.
 
+    Args:
+        licl_frac: molar fraction of LiCl in the ClLiF salt
+        temperature: temperature of the ClLiF salt (C), sets its density
+        source_offset: distance of the generator below the center of the BABY
+            experiment (cm)
+        source_bias: None for the analog source, "target" to only emit the
+            generator directions that can reach the ClLiF and the foils, or
+            "rest" for the other directions. The tallies of the two strata
+            must be combined with source_biasing.combine. Raises a
+            ValueError if the stratum is empty
+        detector_tallies: if True, adds energy-binned flux and reaction rate
+            tallies in the diamond detector and activation foil cells
+        with_vault: if False, the experimental lab is not placed in the
+            Nuclear Vault and its boundaries are vacuum
+        um_tbr: if True, adds the TBR tally on the unstructured mesh (needs
+            OpenMC built with MOAB and the mesh from mesh_creation.py)
+        dagmc: if True, the BABY assembly is a DAGMC universe (see
+            baby_geometry) and the TBR tallies are filtered by the ClLiF
+            material instead of its cell
+        geometry_params: dimensions passed to baby_geometry (cllif_thickness,
+            cllif_radius, heater_r, heater_h, heater_gap, detector_distance)
+
     Returns:
         the openmc model
     """
 
+    cllif = cllif_material(licl_frac, temperature)
     materials = [
         inconel625,
-        cllif_nat,
+        cllif,
         SS304,
         heater_mat,
         firebrick,
@@ -480,9 +493,7 @@ def baby_model():
     ]
 
     # BABY coordinates
-    x_c = 587  # cm
-    y_c = 60  # cm
-    z_c = 100  # cm
+    x_c, y_c, z_c = BABY_CENTER
     (
         experimental_lab,
         cllif_cell,
@@ -490,7 +501,15 @@ def baby_model():
         act_foils_zr_cell,
         act_foils_nb_cell,
         cells,
-    ) = baby_geometry(x_c, y_c, z_c)
+    ) = baby_geometry(
+        x_c,
+        y_c,
+        z_c,
+        source_offset=source_offset,
+        cllif_material=cllif,
+        dagmc=dagmc,
+        **geometry_params,
+    )
 
     # The coordinates of the source in the Nuclear Vault used in a separate experiment
     x_c_ns = 500.5
@@ -502,7 +521,26 @@ def baby_model():
 
     settings = openmc.Settings()
 
-    src = A325_generator_diamond((x_c, y_c, z_c - 5.635), (1, 0, 0))
+    src = A325_generator_diamond((x_c, y_c, z_c - source_offset), (1, 0, 0))
+    if source_bias is not None:
+        if source_bias not in source_biasing.SOURCE_STRATA:
+            raise ValueError("source_bias must be None, 'target' or 'rest'")
+        if dagmc:
+            # the ClLiF has no cell in the DAGMC model, the targets are
+            # bounded on the CSG model with the same dimensions
+            targets = source_biasing.baby_targets(
+                source_offset=source_offset, **geometry_params
+            )
+        else:
+            targets = source_biasing.bounding_spheres(
+                [cllif_cell, act_foils_zr_cell, act_foils_nb_cell]
+            )
+        target_src, rest_src, _ = source_biasing.stratify_source(src, targets)
+        src = target_src if source_bias == "target" else rest_src
+        # "rest" is empty when the targets cover every direction, "target"
+        # when they cover none
+        if not src:
+            raise ValueError(f"The {source_bias!r} source stratum is empty")
     # The underlying source is part of a separate experiment carried out inside the Nuclear Vault
     # src = A325_generator_diamond((x_c_ns - 20.5, y_c_ns, z_c_ns), (1, 0, 0))
     settings.source = src
@@ -519,23 +557,51 @@ def baby_model():
     # Specify Tallies
     tallies = openmc.Tallies()
 
-    # sets up filters for the tallies
-    # mesh filters
-    unstructured_mesh = openmc.UnstructuredMesh(
-        "../unstructured_mesh/baby.vtk", library="moab"
-    )
-    unstructured_mesh_filter = openmc.MeshFilter(unstructured_mesh)
+    # the cells of the DAGMC universe are only known to OpenMC at runtime
+    if dagmc:
+        cllif_filter = openmc.MaterialFilter(cllif)
+    else:
+        cllif_filter = openmc.CellFilter(cllif_cell)
 
     tbr_tally = openmc.Tally(name="TBR")
     tbr_tally.scores = ["(n,Xt)"]
-    tbr_tally.filters = [openmc.CellFilter(cllif_cell)]
+    tbr_tally.filters = [cllif_filter]
     tbr_tally.nuclides = ["Li6", "Li7"]
     tallies.append(tbr_tally)
 
-    tbr_mesh_tally = openmc.Tally(name="UM_TBR")
-    tbr_mesh_tally.scores = ["(n,Xt)"]
-    tbr_mesh_tally.filters = [openmc.CellFilter(cllif_cell), unstructured_mesh_filter]
-    tallies.append(tbr_mesh_tally)
+    if um_tbr:
+        # sets up filters for the tallies
+        # mesh filters
+        unstructured_mesh = openmc.UnstructuredMesh(str(UM_TBR_MESH), library="moab")
+        unstructured_mesh_filter = openmc.MeshFilter(unstructured_mesh)
+
+        tbr_mesh_tally = openmc.Tally(name="UM_TBR")
+        tbr_mesh_tally.scores = ["(n,Xt)"]
+        tbr_mesh_tally.filters = [cllif_filter, unstructured_mesh_filter]
+        tallies.append(tbr_mesh_tally)
+
+    if detector_tallies:
+        energy_filter = openmc.EnergyFilter(ENERGY_BINS)
+
+        diamond_tally = openmc.Tally(name=DIAMOND_SPECTRUM_TALLY)
+        diamond_tally.scores = ["flux", "elastic", "(n,a)"]
+        diamond_tally.filters = [openmc.CellFilter(diamond_detect_cell), energy_filter]
+        tallies.append(diamond_tally)
+
+        for name, foil_cell in [("Zr", act_foils_zr_cell), ("Nb", act_foils_nb_cell)]:
+            foil_tally = openmc.Tally(name=f"{name}_foil_spectrum")
+            foil_tally.scores = ["flux", "(n,2n)"]
+            foil_tally.filters = [openmc.CellFilter(foil_cell), energy_filter]
+            tallies.append(foil_tally)
+
+    if not with_vault:
+        experimental_lab.boundary_type = "vacuum"
+        return openmc.Model(
+            geometry=openmc.Geometry(cells),
+            materials=openmc.Materials(materials),
+            settings=settings,
+            tallies=tallies,
+        )
 
     model = vault.build_vault_model(
         settings=settings,
@@ -548,6 +614,19 @@ def baby_model():
     return model
 
 
+def default_parameters() -> dict:
+    """Returns the default values of the keyword arguments of baby_model(),
+    including the dimensions it passes to baby_geometry()."""
+    defaults = {}
+    for function in [baby_geometry, baby_model]:
+        for name, parameter in inspect.signature(function).parameters.items():
+            if parameter.default is not inspect.Parameter.empty:
+                defaults[name] = parameter.default
+    # set by baby_model itself
+    del defaults["cllif_material"]
+    return defaults
+
+
 ############################################################################
 # Define Materials
 # Source: PNNL Materials Compendium April 2021
@@ -568,15 +647,27 @@ inconel625.add_element("Nb", 0.036500, "wo")
 inconel625.add_element("Mo", 0.090000, "wo")
 inconel625.set_density("g/cm3", 8.44)
 
+
 # lif-licl - natural - pure
-licl_frac = 0.695
-cllif_nat = openmc.Material(name="ClLiF natural")
-cllif_nat.add_element("F", 0.5 * (1 - licl_frac), "ao")
-cllif_nat.add_element("Li", 0.5 * (1 - licl_frac) + 0.5 * licl_frac, "ao")
-cllif_nat.add_element("Cl", 0.5 * licl_frac, "ao")
-cllif_nat.set_density(
-    "g/cm3", helpers.get_exp_cllif_density(650)
-)  # 69.5 at. % LiCL at 650 C
+def cllif_material(licl_frac: float = 0.695, temperature: float = 650):
+    """Returns the natural ClLiF salt material.
+
+    Args:
+        licl_frac: molar fraction of LiCl
+        temperature: temperature of the salt (C)
+
+    Returns:
+        the openmc material
+    """
+    cllif = openmc.Material(name="ClLiF natural")
+    cllif.add_element("F", 0.5 * (1 - licl_frac), "ao")
+    cllif.add_element("Li", 0.5 * (1 - licl_frac) + 0.5 * licl_frac, "ao")
+    cllif.add_element("Cl", 0.5 * licl_frac, "ao")
+    cllif.set_density("g/cm3", helpers.get_exp_cllif_density(temperature, licl_frac))
+    return cllif
+
+
+cllif_nat = cllif_material()  # 69.5 at. % LiCL at 650 C
 
 # Stainless Steel 304 from PNNL Materials Compendium (PNNL-15870 Rev2)
 SS304 = openmc.Material(name="Stainless Steel 304")
@@ -687,4 +778,40 @@ Nb.set_density("g/cm3", 8.4)
 Nb.add_nuclide("Nb93", 1.0, "ao")
 
 if __name__ == "__main__":
-    baby_model().run(geometry_debug=False)
+    parser = argparse.ArgumentParser(description="Runs the BABY openmc model")
+    parser.add_argument(
+        "--skip-geometry-check",
+        action="store_true",
+        help="do not check the geometry for overlaps before running",
+    )
+    parser.add_argument(
+        "--telemetry",
+        metavar="FILE",
+        help="stream per-batch run telemetry as JSON lines to FILE ('-' for stdout)",
+    )
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--dagmc",
+        action="store_true",
+        help="use the DAGMC model of the BABY assembly (see cad_geometry.py)",
+    )
+    args = parser.parse_args()
+
+    if not args.skip_geometry_check:
+        import geometry_check
+
+        result = geometry_check.check_baby_geometry(dagmc=args.dagmc)
+        geometry_check.print_report(result)
+        if not result["passed"]:
+            raise SystemExit("Geometry check failed, see the report above.")
+
+    if args.telemetry:
+        from telemetry import Telemetry, run_with_telemetry
+
+        telemetry = Telemetry(None if args.telemetry == "-" else args.telemetry)
+        run_with_telemetry(
+            baby_model(dagmc=args.dagmc), telemetry, threads=args.threads
+        )
+        telemetry.close()
+    else:
+        baby_model(dagmc=args.dagmc).run(geometry_debug=False, threads=args.threads)
@@ -0,0 +1,187 @@
+import io
+import tempfile
+
+import numpy as np
+
+from openmc_model import baby_model, default_parameters
+from telemetry import Telemetry, run_with_telemetry
+
+# documented 1-sigma uncertainties of the BABY dimensions (cm), the diamond
+# detector is "9.6 +/- 0.2 cm" below the generator (see baby_geometry)
+DOCUMENTED_TOLERANCES = {
+    "detector_distance": 0.2,
+}
+
+
+def batch_tbr(model, seed: int = 1, threads: int = None) -> np.ndarray:
+    """Runs a model and returns the TBR of each batch.
+
+    Args:
+        model: the openmc model
+        seed: seed of the random number streams
+        threads: number of OpenMP threads
+
+    Returns:
+        array of shape (n_batches,)
+    """
+    model.settings.seed = seed
+    with tempfile.TemporaryDirectory() as tmp:
+        _, records = run_with_telemetry(
+            model, Telemetry(io.StringIO()), cwd=tmp, threads=threads, output=False
+        )
+    # the telemetry gives the running mean, recover the batch values
+    running_mean = np.array([r["tbr"] for r in records if r["event"] == "batch"])
+    cumulative = running_mean * np.arange(1, len(running_mean) + 1)
+    return np.diff(cumulative, prepend=0.0)
+
+
+def correlated_tbr_differences(
+    variants: dict,
+    nominal: dict = None,
+    particles: int = None,
+    batches: int = None,
+    seed: int = 1,
+    threads: int = None,
+) -> dict:
+    """Computes the TBR differences between geometry variants and the nominal
+    model with correlated sampling.
+
+    All the models run with the same seed, so batch i of every variant
+    transports the same source particles with the same random number
+    streams. The differences are computed batch by batch, which removes
+    most of the Monte Carlo noise shared by the variants.
+
+    Args:
+        variants: dict {name: baby_model() keyword arguments} of the variants
+        nominal: baby_model() keyword arguments of the nominal model
+        particles: number of particles per batch (defaults to the model's)
+        batches: number of batches (defaults to the model's)
+        seed: seed of the random number streams
+        threads: number of OpenMP threads
+
+    Returns:
+        dict {name: result} where result contains the TBR of the variant,
+        the difference with the nominal TBR ("delta") and its standard
+        deviation with correlated sampling ("delta_std") and with independent
+        runs ("independent_std"), and the variance reduction factor
+    """
+    nominal = nominal or {}
+
+    def run(params):
+        # the mesh tally is not needed and only slows down the variants
+        model = baby_model(**{"um_tbr": False, **params})
+        if particles is not None:
+            model.settings.particles = particles
+        if batches is not None:
+            model.settings.batches = batches
+        return batch_tbr(model, seed, threads)
+
+    nominal_tbr = run(nominal)
+    n_batches = len(nominal_tbr)
+
+    results = {}
+    for name, params in variants.items():
+        variant_tbr = run({**nominal, **params})
+        delta = variant_tbr - nominal_tbr
+        delta_std = delta.std(ddof=1) / np.sqrt(n_batches)
+        independent_std = np.sqrt(
+            (variant_tbr.var(ddof=1) + nominal_tbr.var(ddof=1)) / n_batches
+        )
+        results[name] = {
+            "params": params,
+            "tbr": variant_tbr.mean(),
+            "nominal_tbr": nominal_tbr.mean(),
+            "delta": delta.mean(),
+            "delta_std": delta_std,
+            "independent_std": independent_std,
+            "variance_reduction": (independent_std / delta_std) ** 2,
+        }
+    return results
+
+
+def tolerance_study(tolerances: dict, nominal: dict = None, **kwargs) -> dict:
+    """Propagates the uncertainties of the BABY dimensions to the TBR with
+    central differences computed by correlated sampling.
+
+    Args:
+        tolerances: dict {baby_model() argument: 1-sigma uncertainty}, for
+            instance DOCUMENTED_TOLERANCES
+        nominal: baby_model() keyword arguments of the nominal model
+        kwargs: passed to correlated_tbr_differences
+
+    Returns:
+        dict with the sensitivity dTBR/dx and TBR uncertainty of each
+        dimension ("sensitivities"), the total TBR uncertainty ("tbr_std",
+        dimensions assumed independent) and the variant results ("variants")
+    """
+    defaults = default_parameters()
+    nominal = nominal or {}
+    variants = {}
+    for name, sigma in tolerances.items():
+        value = nominal.get(name, defaults[name])
+        variants[f"{name}+"] = {name: value + sigma}
+        variants[f"{name}-"] = {name: value - sigma}
+
+    results = correlated_tbr_differences(variants, nominal, **kwargs)
+
+    sensitivities = {}
+    for name, sigma in tolerances.items():
+        plus, minus = results[f"{name}+"], results[f"{name}-"]
+        derivative = (plus["delta"] - minus["delta"]) / (2 * sigma)
+        sensitivities[name] = {
+            "derivative": derivative,
+            "derivative_std": np.hypot(plus["delta_std"], minus["delta_std"])
+            / (2 * sigma),
+            "tbr_std": abs(derivative) * sigma,
+        }
+
+    return {
+        "sensitivities": sensitivities,
+        "tbr_std": np.sqrt(sum(s["tbr_std"] ** 2 for s in sensitivities.values())),
+        "variants": results,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Propagates the BABY dimension tolerances to the TBR"
+    )
+    parser.add_argument("--particles", type=int, default=int(1e4))
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--tolerance",
+        nargs=2,
+        action="append",
+        metavar=("NAME", "SIGMA"),
+        help="1-sigma uncertainty (cm) of a baby_model() argument, can be "
+        "repeated (defaults to the documented detector_distance 0.2 cm)",
+    )
+    args = parser.parse_args()
+
+    if args.tolerance:
+        tolerances = {name: float(sigma) for name, sigma in args.tolerance}
+    else:
+        tolerances = DOCUMENTED_TOLERANCES
+    study = tolerance_study(
+        tolerances,
+        particles=args.particles,
+        batches=args.batches,
+        seed=args.seed,
+        threads=args.threads,
+    )
+    for name, result in study["variants"].items():
+        print(
+            f"{name}: dTBR = {result['delta']:.3e} +/- {result['delta_std']:.3e} "
+            f"(independent runs: +/- {result['independent_std']:.3e}, "
+            f"variance reduction x{result['variance_reduction']:.1f})"
+        )
+    for name, sensitivity in study["sensitivities"].items():
+        print(
+            f"{name}: dTBR/dx = {sensitivity['derivative']:.3e} "
+            f"+/- {sensitivity['derivative_std']:.3e} /cm"
+        )
+    print(f"TBR uncertainty from the tolerances: {study['tbr_std']:.3e}")
@@ -0,0 +1,186 @@
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgb
+
+import helpers
+
+CACHE_DIR = Path(__file__).parent / ".cache" / "plots"
+
+# indices of the horizontal and vertical axes for each basis
+BASES = {"xy": (0, 1), "xz": (0, 2), "yz": (1, 2)}
+
+SliceView = namedtuple("SliceView", ["origin", "width", "pixels", "basis"])
+
+
+def _compute_id_map(model, view: SliceView) -> np.ndarray:
+    """Rasterizes a slice of the model, returns the (cell ID, instance,
+    material ID) of each pixel."""
+    return model.id_map(
+        origin=view.origin, width=view.width, pixels=view.pixels, basis=view.basis
+    )
+
+
+class PlotService:
+    """Renders slices of an openmc model and caches the raster ID maps.
+
+    The ID maps are cached in memory and on disk, keyed by the geometry hash
+    and the view, so changing only the colors or the highlighted domains
+    recolors the cached raster without plotting the geometry again.
+
+    Args:
+        model: the openmc model
+        cache_dir: directory of the on-disk cache
+        processes: number of processes used to render the uncached views
+            (defaults to the number of CPUs)
+    """
+
+    def __init__(self, model, cache_dir=CACHE_DIR, processes: int = None):
+        self.model = model
+        self.cache_dir = Path(cache_dir)
+        self.processes = processes
+
+        self.cells = list(model.geometry.get_all_cells().values())
+        self.geometry_hash = helpers.geometry_hash(self.cells)
+        self.cell_keys = np.array([f"cell{i}" for i in range(len(self.cells))])
+        self._cell_index = {cell.id: i for i, cell in enumerate(self.cells)}
+        materials = model.geometry.get_all_materials().values()
+        self._material_key = {m.id: helpers.material_key(m) for m in materials}
+        self._id_maps = {}
+
+    def _cache_file(self, view: SliceView) -> Path:
+        view_hash = hashlib.sha256(repr(tuple(view)).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{self.geometry_hash}_{view_hash}.npz"
+
+    def _to_keys(self, id_map: np.ndarray) -> dict:
+        """Converts the raw IDs into indices of cell and material keys, which
+        do not depend on the IDs of the current session."""
+        cell_ids = id_map[..., 0]
+        material_ids = id_map[..., 2]
+        cells = np.full(cell_ids.shape, -1, dtype=np.int32)
+        for cell_id in np.unique(cell_ids):
+            if cell_id in self._cell_index:
+                cells[cell_ids == cell_id] = self._cell_index[cell_id]
+
+        unique_ids = [m for m in np.unique(material_ids) if m in self._material_key]
+        material_keys = np.array([self._material_key[m] for m in unique_ids])
+        materials = np.full(material_ids.shape, -1, dtype=np.int32)
+        for i, material_id in enumerate(unique_ids):
+            materials[material_ids == material_id] = i
+        return {"cells": cells, "materials": materials, "material_keys": material_keys}
+
+    def id_maps(self, views: list) -> list:
+        """Returns the cached ID maps of several views, rendering the missing
+        ones concurrently.
+
+        Args:
+            views: list of SliceView
+
+        Returns:
+            list of dicts with the keys "cells", "materials" and
+            "material_keys"
+        """
+        views = [SliceView(*view) for view in views]
+        missing = []
+        for view in views:
+            if view in self._id_maps:
+                continue
+            cache_file = self._cache_file(view)
+            if cache_file.exists():
+                with np.load(cache_file) as data:
+                    self._id_maps[view] = dict(data)
+            elif view not in missing:
+                missing.append(view)
+
+        if missing:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                futures = [
+                    executor.submit(_compute_id_map, self.model, view)
+                    for view in missing
+                ]
+                for view, future in zip(missing, futures):
+                    self._id_maps[view] = self._to_keys(future.result())
+                    self.cache_dir.mkdir(parents=True, exist_ok=True)
+                    np.savez_compressed(self._cache_file(view), **self._id_maps[view])
+
+        return [self._id_maps[view] for view in views]
+
+    def image(
+        self,
+        view: SliceView,
+        color_by: str = "material",
+        colors: dict = None,
+        highlight: list = None,
+        highlight_alpha: float = 0.25,
+        seed: int = 1,
+    ) -> np.ndarray:
+        """Builds the RGB image of a view from the cached ID map.
+
+        Args:
+            view: the SliceView
+            color_by: "material" or "cell"
+            colors: dict {openmc.Material or openmc.Cell: color}
+            highlight: list of materials or cells to highlight, the others
+                are faded towards white
+            highlight_alpha: opacity of the non highlighted domains
+            seed: seed of the default random colors
+
+        Returns:
+            array of shape (v_pixels, h_pixels, 3)
+        """
+        (id_map,) = self.id_maps([view])
+        if color_by == "material":
+            indices, keys = id_map["materials"], list(id_map["material_keys"])
+            domain_key = lambda domain: helpers.material_key(domain)
+        elif color_by == "cell":
+            indices, keys = id_map["cells"], list(self.cell_keys)
+            domain_key = lambda domain: self.cell_keys[self._cell_index[domain.id]]
+        else:
+            raise ValueError(f"color_by must be 'material' or 'cell', not {color_by}")
+
+        user_colors = {domain_key(d): to_rgb(c) for d, c in (colors or {}).items()}
+        palette = np.empty((len(keys) + 1, 3))
+        for i, key in enumerate(keys):
+            if key in user_colors:
+                palette[i] = user_colors[key]
+            else:
+                key_seed = int(hashlib.sha256(f"{seed}{key}".encode()).hexdigest(), 16)
+                palette[i] = np.random.default_rng(key_seed % 2**32).random(3)
+        palette[-1] = 1.0  # void and undefined pixels are white
+
+        if highlight is not None:
+            highlighted = {domain_key(d) for d in highlight}
+            faded = np.array([key not in highlighted for key in keys] + [False])
+            palette[faded] = highlight_alpha * palette[faded] + (1 - highlight_alpha)
+
+        return palette[indices]
+
+    def plot(self, view: SliceView, axes=None, **kwargs):
+        """Plots a view with matplotlib, with the same extent and labels as
+        openmc.Geometry.plot.
+
+        Args:
+            view: the SliceView
+            axes: matplotlib axes (a new figure is created if None)
+            kwargs: passed to PlotService.image
+
+        Returns:
+            the matplotlib axes
+        """
+        view = SliceView(*view)
+        h, v = BASES[view.basis]
+        x_min = view.origin[h] - 0.5 * view.width[0]
+        x_max = view.origin[h] + 0.5 * view.width[0]
+        y_min = view.origin[v] - 0.5 * view.width[1]
+        y_max = view.origin[v] + 0.5 * view.width[1]
+
+        if axes is None:
+            _, axes = plt.subplots()
+        axes.imshow(self.image(view, **kwargs), extent=(x_min, x_max, y_min, y_max))
+        axes.set_xlabel(f"{'xyz'[h]} [cm]")
+        axes.set_ylabel(f"{'xyz'[v]} [cm]")
+        return axes
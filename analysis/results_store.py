@@ -0,0 +1,295 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+import openmc
+
+import helpers
+
+STORE_FILE = Path(__file__).parent / "results" / "results.h5"
+RUNS_DIR = Path(__file__).parent / "results" / "runs"
+
+SUMMARY_DTYPE = np.dtype(
+    [
+        ("key", h5py.string_dtype()),
+        ("params", h5py.string_dtype()),
+        ("tbr", float),
+        ("tbr_std", float),
+        ("particles", int),
+        ("batches", int),
+        ("seed", int),
+        ("runtime", float),
+        ("timestamp", float),
+    ]
+)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def full_parameters(params: dict = None) -> dict:
+    """Returns the baby_model() arguments with the defaults filled in, so
+    that {} and {"licl_frac": 0.695} describe the same run."""
+    from openmc_model import default_parameters
+
+    return {**default_parameters(), **(params or {})}
+
+
+def _check_analog(params: dict):
+    """The store holds analog runs only: the TBR of a single source stratum
+    is not the TBR of the experiment (see source_biasing.combine)."""
+    if (params or {}).get("source_bias") is not None:
+        raise ValueError("Runs with a source_bias cannot be stored")
+
+
+def model_key(model, params: dict) -> str:
+    """Calculates the key of a model run from the baby_model() arguments,
+    the geometry and the run settings.
+
+    Args:
+        model: the openmc model
+        params: keyword arguments passed to baby_model(), missing arguments
+            take their default values
+
+    Returns:
+        the hexadecimal key (32 characters)
+    """
+    settings = model.settings
+    description = {
+        "params": full_parameters(params),
+        "geometry": helpers.geometry_hash(model.geometry.get_all_cells().values()),
+        "particles": settings.particles,
+        "batches": settings.batches,
+        "seed": settings.seed,
+    }
+    text = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+
+class ResultsStore:
+    """HDF5 store of BABY model results indexed by model key.
+
+    Each run is stored in the group /runs/<key> with the run metadata as
+    attributes and the mean and standard deviation of every tally. A summary
+    table with one row per run (TBR, parameters and metadata) is kept in
+    /summary so that trends across many runs are loaded in one read.
+
+    Args:
+        filename: path of the HDF5 file
+    """
+
+    def __init__(self, filename=STORE_FILE):
+        self.filename = Path(filename)
+
+    def __contains__(self, key: str) -> bool:
+        if not self.filename.exists():
+            return False
+        with h5py.File(self.filename, "r") as f:
+            return f"runs/{key}" in f
+
+    def __len__(self) -> int:
+        if not self.filename.exists():
+            return 0
+        with h5py.File(self.filename, "r") as f:
+            return len(f["summary"]) if "summary" in f else 0
+
+    def add(
+        self, key: str, params: dict, statepoint_file, runtime: float, threads=None
+    ) -> dict:
+        """Adds the results of a statepoint to the store.
+
+        Args:
+            key: the model key (see model_key)
+            params: keyword arguments passed to baby_model(), stored with
+                the defaults filled in (source_bias is not allowed)
+            statepoint_file: path to the statepoint file
+            runtime: wall time of the run (s)
+            threads: number of OpenMP threads used for the run
+
+        Returns:
+            the stored record (see ResultsStore.get)
+        """
+        _check_analog(params)
+        self.filename.parent.mkdir(parents=True, exist_ok=True)
+        with openmc.StatePoint(statepoint_file) as sp, h5py.File(
+            self.filename, "a"
+        ) as f:
+            tbr = sp.get_tally(name="TBR").get_pandas_dataframe()
+            metadata = {
+                "params": json.dumps(
+                    full_parameters(params), sort_keys=True, default=str
+                ),
+                "tbr": tbr["mean"].sum(),
+                "tbr_std": tbr["std. dev."].sum(),
+                "particles": sp.n_particles,
+                "batches": sp.n_batches,
+                "seed": sp.seed,
+                "runtime": runtime,
+                "timestamp": time.time(),
+            }
+
+            if f"runs/{key}" in f:
+                del f[f"runs/{key}"]
+            group = f.create_group(f"runs/{key}")
+            group.attrs.update(metadata)
+            group.attrs["threads"] = threads if threads is not None else -1
+            group.attrs["openmc_version"] = ".".join(map(str, sp.version))
+            group.attrs["statepoint_file"] = str(Path(statepoint_file).resolve())
+            for tally in sp.tallies.values():
+                tally_group = group.create_group(f"tallies/{tally.name or tally.id}")
+                tally_group.create_dataset("mean", data=tally.mean, compression="gzip")
+                tally_group.create_dataset(
+                    "std_dev", data=tally.std_dev, compression="gzip"
+                )
+
+            row = np.array(
+                [tuple([key] + [metadata[name] for name in SUMMARY_DTYPE.names[1:]])],
+                dtype=SUMMARY_DTYPE,
+            )
+            if "summary" not in f:
+                f.create_dataset("summary", data=row, maxshape=(None,), chunks=True)
+            else:
+                summary = f["summary"]
+                keys = [_decode(k) for k in summary.fields("key")[:]]
+                existing = np.flatnonzero(np.array(keys) == key)
+                if len(existing):
+                    summary[existing[0]] = row[0]
+                else:
+                    summary.resize((len(summary) + 1,))
+                    summary[-1] = row[0]
+
+        return self.get(key)
+
+    def get(self, key: str) -> dict:
+        """Returns a stored run.
+
+        Args:
+            key: the model key
+
+        Returns:
+            dict with the run metadata, the parameters (under "params") and
+            the tallies (under "tallies", {name: {"mean": ..., "std_dev": ...}})
+        """
+        with h5py.File(self.filename, "r") as f:
+            group = f[f"runs/{key}"]
+            record = dict(group.attrs)
+            record["key"] = key
+            record["params"] = json.loads(record["params"])
+            record["tallies"] = {
+                name: {value: tally[value][()] for value in ["mean", "std_dev"]}
+                for name, tally in group["tallies"].items()
+            }
+        return record
+
+    def summary(self) -> np.ndarray:
+        """Returns the summary table of all the runs in one read.
+
+        Returns:
+            structured array with the fields of SUMMARY_DTYPE
+        """
+        if not self.filename.exists():
+            return np.zeros(0, dtype=SUMMARY_DTYPE)
+        with h5py.File(self.filename, "r") as f:
+            if "summary" not in f:
+                return np.zeros(0, dtype=SUMMARY_DTYPE)
+            summary = f["summary"][()]
+        for field in ["key", "params"]:
+            summary[field] = [_decode(s) for s in summary[field]]
+        return summary
+
+    def find(self, **params) -> list:
+        """Finds the keys of the runs whose baby_model() parameters include
+        the given values, default values included.
+
+        Args:
+            params: parameter values to match, for instance cllif_radius=7.0
+
+        Returns:
+            list of keys
+        """
+        return [
+            row["key"]
+            for row in self.summary()
+            if all(
+                json.loads(row["params"]).get(name) == value
+                for name, value in params.items()
+            )
+        ]
+
+    def load_tally(self, keys: list, name: str, value: str = "mean") -> np.ndarray:
+        """Loads a tally of several runs stacked along the first axis.
+
+        Args:
+            keys: list of model keys (runs must have the same tally shape)
+            name: name of the tally, for instance "UM_TBR"
+            value: "mean" or "std_dev"
+
+        Returns:
+            array of shape (len(keys), ...)
+        """
+        with h5py.File(self.filename, "r") as f:
+            return np.stack(
+                [f[f"runs/{key}/tallies/{name}/{value}"][()] for key in keys]
+            )
+
+
+def run_cached(
+    store: ResultsStore = None,
+    params: dict = None,
+    particles: int = None,
+    batches: int = None,
+    seed: int = None,
+    threads: int = None,
+    runs_dir=RUNS_DIR,
+    run: bool = True,
+) -> dict:
+    """Runs baby_model() unless the same configuration is already stored.
+
+    Args:
+        store: the results store (defaults to ResultsStore())
+        params: keyword arguments passed to baby_model() (source_bias is not
+            allowed)
+        particles: number of particles per batch (defaults to the model's)
+        batches: number of batches (defaults to the model's)
+        seed: random number seed (defaults to OpenMC's)
+        threads: number of OpenMP threads
+        runs_dir: directory where the runs are carried out
+        run: if False, raises a KeyError instead of running the model when
+            the configuration is not stored
+
+    Returns:
+        the stored record (see ResultsStore.get)
+    """
+    from openmc_model import baby_model
+
+    store = store if store is not None else ResultsStore()
+    params = params or {}
+    _check_analog(params)
+    model = baby_model(**params)
+    if particles is not None:
+        model.settings.particles = particles
+    if batches is not None:
+        model.settings.batches = batches
+    if seed is not None:
+        model.settings.seed = seed
+
+    key = model_key(model, params)
+    if key in store:
+        return store.get(key)
+    if not run:
+        raise KeyError(
+            f"No stored run {key} for the parameters {params}, "
+            "call run_cached with run=True to run it"
+        )
+
+    run_dir = Path(runs_dir) / key
+    run_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    statepoint_file = model.run(cwd=run_dir, threads=threads)
+    runtime = time.perf_counter() - start
+
+    return store.add(key, params, statepoint_file, runtime, threads)
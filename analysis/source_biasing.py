@@ -0,0 +1,369 @@
+import tempfile
+
+import numpy as np
+import openmc
+
+TWO_PI = 2 * np.pi
+SOURCE_STRATA = ("target", "rest")
+
+
+def bounding_spheres(cells: list) -> list:
+    """Returns the spheres enclosing the bounding boxes of cells.
+
+    Args:
+        cells: list of openmc.Cell with finite bounding boxes
+
+    Returns:
+        list of (center, radius)
+    """
+    spheres = []
+    for cell in cells:
+        lower_left, upper_right = (np.asarray(b) for b in cell.region.bounding_box)
+        center = 0.5 * (lower_left + upper_right)
+        spheres.append((center, 0.5 * np.linalg.norm(upper_right - lower_left)))
+    return spheres
+
+
+def _mu_range(mu) -> tuple:
+    """Returns the support of a distribution of the polar angle cosine."""
+    if isinstance(mu, openmc.stats.Uniform):
+        return mu.a, mu.b
+    if isinstance(mu, openmc.stats.Discrete):
+        return min(mu.x), max(mu.x)
+    if isinstance(mu, openmc.stats.Tabular):
+        return mu.x[0], mu.x[-1]
+    return -1.0, 1.0
+
+
+def _azimuthal_frame(u: np.ndarray) -> tuple:
+    """Returns two unit vectors v, w making a direct frame with u, the
+    azimuthal angle phi is measured from v towards w."""
+    axis = np.zeros(3)
+    axis[np.argmin(np.abs(u))] = 1.0
+    v = np.cross(u, axis)
+    v /= np.linalg.norm(v)
+    return v, np.cross(u, v)
+
+
+def _merge(intervals: list) -> list:
+    """Wraps azimuthal intervals in [0, 2pi) and merges the overlapping
+    ones."""
+    wrapped = []
+    for low, high in intervals:
+        if high - low >= TWO_PI:
+            return [(0.0, TWO_PI)]
+        low, high = low % TWO_PI, low % TWO_PI + (high - low)
+        if high > TWO_PI:
+            wrapped += [(low, TWO_PI), (0.0, high - TWO_PI)]
+        else:
+            wrapped.append((low, high))
+
+    merged = []
+    for low, high in sorted(wrapped):
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def _complement(intervals: list) -> list:
+    gaps, start = [], 0.0
+    for low, high in intervals:
+        if low > start:
+            gaps.append((start, low))
+        start = high
+    if start < TWO_PI:
+        gaps.append((start, TWO_PI))
+    return gaps
+
+
+def target_windows(origin, u, mu_range: tuple, targets: list) -> list:
+    """Computes the azimuthal intervals of a ring of directions around u
+    that can point towards the targets.
+
+    For each target sphere seen from the origin with a half-angle beta, a
+    direction with polar cosine mu and azimuth phi is in the target cone if
+    mu mu_t + sqrt(1 - mu^2) sqrt(1 - mu_t^2) cos(phi - phi_t) >= cos(beta).
+    The interval is the widest over the mu range, so it always contains the
+    cone.
+
+    Args:
+        origin: position of the source
+        u: reference direction of the polar angle
+        mu_range: (lower, upper) polar angle cosines of the ring
+        targets: list of (center, radius) spheres
+
+    Returns:
+        list of merged (phi lower, phi upper) intervals in [0, 2pi)
+    """
+    u = np.asarray(u, dtype=float) / np.linalg.norm(u)
+    v, w = _azimuthal_frame(u)
+    mu = np.linspace(*mu_range, 101)
+    sin_mu = np.sqrt(np.maximum(1 - mu**2, 0))
+
+    intervals = []
+    for center, radius in targets:
+        t = np.asarray(center, dtype=float) - np.asarray(origin, dtype=float)
+        distance = np.linalg.norm(t)
+        if radius >= distance:
+            return [(0.0, TWO_PI)]
+        t /= distance
+        cos_beta = np.sqrt(1 - (radius / distance) ** 2)
+        mu_t = t @ u
+        sin_t = np.sqrt(max(1 - mu_t**2, 0))
+        phi_t = np.arctan2(t @ w, t @ v)
+
+        # cos(phi - phi_t) needed to be in the cone for each mu
+        with np.errstate(divide="ignore", invalid="ignore"):
+            needed = (cos_beta - mu * mu_t) / (sin_mu * sin_t)
+        on_axis = sin_mu * sin_t == 0
+        needed[on_axis] = np.where(mu[on_axis] * mu_t >= cos_beta, -np.inf, np.inf)
+
+        reachable = needed <= 1
+        if not reachable.any():
+            continue
+        half_width = np.max(np.arccos(np.clip(needed[reachable], -1, 1)))
+        intervals.append((phi_t - half_width, phi_t + half_width))
+
+    return _merge(intervals)
+
+
+def stratify_source(sources: list, targets: list) -> tuple:
+    """Splits a source in two strata: the directions that can reach the
+    targets and all the others.
+
+    Each source must be a point with an isotropic angular distribution or a
+    polar-azimuthal one with a uniform azimuth, like the sources of
+    A325_generator_diamond. The azimuth range of each source is split into
+    windows pointing at the targets and the remaining ranges, with strengths
+    proportional to the azimuth ranges.
+
+    Args:
+        sources: list of openmc.IndependentSource
+        targets: list of (center, radius) spheres (see bounding_spheres)
+
+    Returns:
+        the target sources, the rest sources and the probability that an
+        analog source particle belongs to the target stratum
+    """
+    strata = {stratum: [] for stratum in SOURCE_STRATA}
+    total_strength = sum(source.strength for source in sources)
+    target_strength = 0.0
+
+    for source in sources:
+        if not isinstance(source.space, openmc.stats.Point):
+            raise ValueError("Only point sources can be stratified")
+        angle = source.angle
+        if angle is None or isinstance(angle, openmc.stats.Isotropic):
+            u, mu = np.array([0.0, 0.0, 1.0]), openmc.stats.Uniform(-1.0, 1.0)
+        elif (
+            isinstance(angle, openmc.stats.PolarAzimuthal)
+            and isinstance(angle.phi, openmc.stats.Uniform)
+            and np.isclose(angle.phi.b - angle.phi.a, TWO_PI)
+        ):
+            u, mu = np.asarray(angle.reference_uvw, dtype=float), angle.mu
+        else:
+            raise ValueError(
+                f"Cannot stratify the angular distribution {type(angle).__name__}"
+            )
+
+        u = u / np.linalg.norm(u)
+        v, _ = _azimuthal_frame(u)
+        windows = target_windows(source.space.xyz, u, _mu_range(mu), targets)
+        for stratum, intervals in zip(SOURCE_STRATA, [windows, _complement(windows)]):
+            for low, high in intervals:
+                stratum_source = openmc.IndependentSource(
+                    space=source.space,
+                    angle=openmc.stats.PolarAzimuthal(
+                        mu=mu,
+                        phi=openmc.stats.Uniform(low, high),
+                        reference_uvw=u,
+                        reference_vwu=v,
+                    ),
+                    energy=source.energy,
+                    strength=source.strength * (high - low) / TWO_PI,
+                    particle=source.particle,
+                )
+                strata[stratum].append(stratum_source)
+                if stratum == "target":
+                    target_strength += stratum_source.strength
+
+    return strata["target"], strata["rest"], target_strength / total_strength
+
+
+def combine(p_target: float, target: tuple, rest: tuple) -> tuple:
+    """Combines the tallies of the two strata into the analog estimate.
+
+    Args:
+        p_target: probability of the target stratum (see stratify_source)
+        target: (mean, standard deviation) of the target stratum tally
+        rest: (mean, standard deviation) of the rest stratum tally
+
+    Returns:
+        the mean and standard deviation per analog source particle
+    """
+    p_rest = 1 - p_target
+    mean = p_target * target[0] + p_rest * rest[0]
+    std = np.hypot(p_target * target[1], p_rest * rest[1])
+    return mean, std
+
+
+def _run_tbr(model, particles: int, threads: int = None) -> tuple:
+    """Runs a model, returns its TBR, standard deviation and transport time.
+
+    The transport time excludes the XML export, initialization and cross
+    section loading, which do not depend on the number of particles.
+    """
+    model.settings.particles = int(particles)
+    with tempfile.TemporaryDirectory() as tmp:
+        statepoint_file = model.run(cwd=tmp, threads=threads, output=False)
+        with openmc.StatePoint(statepoint_file) as sp:
+            tbr = sp.get_tally(name="TBR").get_pandas_dataframe()
+            runtime = sp.runtime["transport"]
+    return tbr["mean"].sum(), tbr["std. dev."].sum(), runtime
+
+
+def biased_tbr(
+    particles: int = int(1e5),
+    batches: int = 10,
+    pilot_particles: int = int(1e4),
+    threads: int = None,
+    **model_kwargs,
+) -> dict:
+    """Computes the TBR with the stratified source and compares it with the
+    analog source.
+
+    Short pilot runs of each stratum estimate the per particle standard
+    deviation and cost, from which the particles are allocated between the
+    strata (Neyman allocation). The costs and figures of merit use the
+    transport time of the runs. If every source direction reaches the
+    targets, the rest stratum is empty and only the target stratum runs. The
+    biased estimate must agree with the analog one within three standard
+    deviations.
+
+    Args:
+        particles: number of particles per batch of the analog run, the
+            strata share the same total
+        batches: number of batches
+        pilot_particles: number of particles per batch of the pilot runs
+        threads: number of OpenMP threads
+        model_kwargs: passed to baby_model()
+
+    Returns:
+        dict with the analog and biased TBR, standard deviations, run times,
+        figures of merit, FOM improvement and unbiasedness check
+    """
+    from openmc_model import baby_model
+
+    model_kwargs.setdefault("um_tbr", False)
+
+    def model(source_bias=None):
+        model = baby_model(source_bias=source_bias, **model_kwargs)
+        model.settings.batches = batches
+        return model
+
+    analog = _run_tbr(model(), particles, threads)
+
+    target_src, rest_src, p_target = stratify_source(
+        model().settings.source, baby_targets(**model_kwargs)
+    )
+    if not target_src:
+        raise ValueError("No source direction reaches the targets")
+    if not rest_src:
+        # every direction reaches the targets, e.g. the source is inside one
+        p_target = 1.0
+    probabilities = {"target": p_target, "rest": 1 - p_target}
+    strata = [stratum for stratum in SOURCE_STRATA if probabilities[stratum] > 0]
+
+    # per particle standard deviation and time of each stratum
+    pilot = {}
+    for stratum in strata:
+        _, std, runtime = _run_tbr(model(stratum), pilot_particles, threads)
+        n = pilot_particles * batches
+        pilot[stratum] = (std * np.sqrt(n), runtime / n)
+    weights = {
+        stratum: probabilities[stratum] * sigma / np.sqrt(cost)
+        for stratum, (sigma, cost) in pilot.items()
+    }
+    allocation = {
+        stratum: max(1, round(particles * weight / sum(weights.values())))
+        for stratum, weight in weights.items()
+    }
+
+    runs = {s: _run_tbr(model(s), allocation[s], threads) for s in strata}
+    if "rest" in runs:
+        mean, std = combine(p_target, runs["target"][:2], runs["rest"][:2])
+    else:
+        mean, std = runs["target"][:2]
+    runtime = sum(run[2] for run in runs.values())
+
+    fom_analog = 1 / ((analog[1] / analog[0]) ** 2 * analog[2])
+    fom_biased = 1 / ((std / mean) ** 2 * runtime)
+    z_score = (mean - analog[0]) / np.hypot(std, analog[1])
+    return {
+        "p_target": p_target,
+        "allocation": allocation,
+        "analog": {"tbr": analog[0], "std": analog[1], "transport_time": analog[2]},
+        "biased": {"tbr": mean, "std": std, "transport_time": runtime},
+        "fom_analog": fom_analog,
+        "fom_biased": fom_biased,
+        "fom_improvement": fom_biased / fom_analog,
+        "z_score": z_score,
+        "unbiased": abs(z_score) < 3,
+    }
+
+
+def baby_targets(**model_kwargs) -> list:
+    """Returns the target spheres of the BABY model: the ClLiF and the
+    activation foils.
+
+    Args:
+        model_kwargs: baby_model() keyword arguments, the geometry ones are
+            used to build the targets
+
+    Returns:
+        list of (center, radius)
+    """
+    import inspect
+
+    from openmc_model import BABY_CENTER, baby_geometry
+
+    # the targets are cells of the CSG model, also used for the DAGMC model
+    geometry_params = {
+        name: value
+        for name, value in model_kwargs.items()
+        if name in inspect.signature(baby_geometry).parameters and name != "dagmc"
+    }
+    _, cllif_cell, _, zr_cell, nb_cell, _ = baby_geometry(
+        *BABY_CENTER, **geometry_params
+    )
+    return bounding_spheres([cllif_cell, zr_cell, nb_cell])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Compares the stratified source with the analog source"
+    )
+    parser.add_argument("--particles", type=int, default=int(1e5))
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--pilot-particles", type=int, default=int(1e4))
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    result = biased_tbr(
+        args.particles, args.batches, args.pilot_particles, args.threads
+    )
+    print(f"Probability of the target stratum: {result['p_target']:.4f}")
+    print(f"Particle allocation: {result['allocation']}")
+    for name in ["analog", "biased"]:
+        run = result[name]
+        print(
+            f"{name}: TBR = {run['tbr']:.6e} +/- {run['std']:.6e} "
+            f"in {run['transport_time']:.1f} s of transport"
+        )
+    print(f"FOM improvement: x{result['fom_improvement']:.2f}")
+    status = "passed" if result["unbiased"] else "FAILED"
+    print(f"Unbiasedness check {status} (z = {result['z_score']:.2f})")
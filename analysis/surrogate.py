@@ -0,0 +1,314 @@
+import json
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from scipy.optimize import minimize
+
+# design parameters of baby_model() and their default ranges
+DEFAULT_BOUNDS = {
+    "licl_frac": (0.6, 0.8),
+    # C, the ClLiF density correlation is valid from 660 C
+    # (see helpers.get_exp_cllif_density)
+    "temperature": (660.0, 800.0),
+    "cllif_thickness": (4.0, 9.0),  # cm
+    "cllif_radius": (5.0, 7.2),  # cm
+    "heater_r": (0.3, 0.6),  # cm
+}
+
+# baby_model() arguments that only add tallies, ignored when selecting the
+# training runs
+TALLY_PARAMETERS = ("um_tbr", "detector_tallies")
+
+
+def latin_hypercube(n: int, bounds: dict, seed: int = 0) -> np.ndarray:
+    """Samples n points in the parameter space with a latin hypercube.
+
+    Args:
+        n: number of points
+        bounds: dict {name: (lower, upper)}
+        seed: seed of the random number generator
+
+    Returns:
+        array of shape (n, len(bounds))
+    """
+    rng = np.random.default_rng(seed)
+    lower, upper = np.array(list(bounds.values()), dtype=float).T
+    strata = np.stack([rng.permutation(n) for _ in bounds], axis=1)
+    unit = (strata + rng.random((n, len(bounds)))) / n
+    return lower + unit * (upper - lower)
+
+
+class TBRSurrogate:
+    """Gaussian process surrogate of the TBR over the BABY design parameters.
+
+    The Monte Carlo standard deviation of each training run is used as a
+    (heteroscedastic) noise, and the length scales of the squared exponential
+    kernel are fitted by maximising the marginal likelihood.
+
+    Args:
+        bounds: dict {name: (lower, upper)} of the design parameters, the
+            inputs are normalised to the unit hypercube with these bounds
+    """
+
+    def __init__(self, bounds: dict = DEFAULT_BOUNDS):
+        self.bounds = dict(bounds)
+        self.names = list(self.bounds)
+        self.lower, self.upper = np.array(list(self.bounds.values()), dtype=float).T
+        self.log_length_scales = np.zeros(len(self.names))
+        self.log_amplitude = 0.0
+
+    def _normalise(self, x) -> np.ndarray:
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        return (x - self.lower) / (self.upper - self.lower)
+
+    def _kernel(self, a, b, log_length_scales=None, log_amplitude=None):
+        if log_length_scales is None:
+            log_length_scales = self.log_length_scales
+        if log_amplitude is None:
+            log_amplitude = self.log_amplitude
+        scaled_a = a / np.exp(log_length_scales)
+        scaled_b = b / np.exp(log_length_scales)
+        sq_dist = (
+            np.sum(scaled_a**2, axis=1)[:, None]
+            + np.sum(scaled_b**2, axis=1)[None, :]
+            - 2 * scaled_a @ scaled_b.T
+        )
+        return np.exp(2 * log_amplitude - 0.5 * np.maximum(sq_dist, 0))
+
+    def _cholesky(self, x, noise, log_length_scales=None, log_amplitude=None):
+        k = self._kernel(x, x, log_length_scales, log_amplitude)
+        k[np.diag_indices_from(k)] += noise + 1e-10
+        return cholesky(k, lower=True)
+
+    def _negative_log_likelihood(self, theta, x, y, noise):
+        try:
+            chol = self._cholesky(x, noise, theta[:-1], theta[-1])
+        except np.linalg.LinAlgError:
+            return np.inf
+        alpha = cho_solve((chol, True), y)
+        return 0.5 * y @ alpha + np.sum(np.log(np.diag(chol)))
+
+    def fit(self, x, tbr, tbr_std, restarts: int = 5, seed: int = 0):
+        """Fits the surrogate to a set of runs.
+
+        Args:
+            x: design parameters of the runs, shape (n_runs, n_parameters)
+            tbr: TBR of the runs, shape (n_runs,)
+            tbr_std: Monte Carlo standard deviation of the TBR
+            restarts: number of random restarts of the hyperparameter
+                optimisation
+            seed: seed of the random restarts
+
+        Returns:
+            the surrogate
+        """
+        self.x = self._normalise(x)
+        tbr = np.asarray(tbr, dtype=float)
+        if len(tbr) < 2:
+            raise ValueError("At least two runs are needed to fit the surrogate")
+
+        self.mean = tbr.mean()
+        self.scale = tbr.std() or 1.0
+        self.y = (tbr - self.mean) / self.scale
+        self.noise = (np.asarray(tbr_std, dtype=float) / self.scale) ** 2
+
+        rng = np.random.default_rng(seed)
+        n_dims = len(self.names)
+        bounds = [(np.log(1e-2), np.log(10.0))] * (n_dims + 1)
+        starts = [np.zeros(n_dims + 1)] + [
+            rng.uniform(np.log(0.1), np.log(2.0), n_dims + 1) for _ in range(restarts)
+        ]
+        best = min(
+            (
+                minimize(
+                    self._negative_log_likelihood,
+                    start,
+                    args=(self.x, self.y, self.noise),
+                    method="L-BFGS-B",
+                    bounds=bounds,
+                )
+                for start in starts
+            ),
+            key=lambda result: result.fun,
+        )
+        self.log_length_scales = best.x[:-1]
+        self.log_amplitude = best.x[-1]
+
+        self._chol = self._cholesky(self.x, self.noise)
+        self._alpha = cho_solve((self._chol, True), self.y)
+        return self
+
+    def predict(self, x):
+        """Predicts the TBR and its uncertainty at any number of points.
+
+        Args:
+            x: design parameters, shape (n_points, n_parameters) or
+                (n_parameters,)
+
+        Returns:
+            the mean and standard deviation of the TBR, shape (n_points,)
+        """
+        k = self._kernel(self._normalise(x), self.x)
+        mean = k @ self._alpha
+        v = solve_triangular(self._chol, k.T, lower=True)
+        var = np.exp(2 * self.log_amplitude) - np.sum(v**2, axis=0)
+        return self.mean + self.scale * mean, self.scale * np.sqrt(np.maximum(var, 0))
+
+    def suggest(self, n: int = 1, candidates=None, n_candidates: int = 4096, seed=0):
+        """Suggests the next runs, chosen greedily where the predictive
+        variance is the largest. The variance does not depend on the TBR
+        values, so each chosen point is added as a pending run before
+        choosing the next one.
+
+        Args:
+            n: number of runs to suggest
+            candidates: candidate design parameters, shape
+                (n_candidates, n_parameters) (defaults to a latin hypercube)
+            n_candidates: number of candidates if candidates is None
+            seed: seed of the candidates sampling
+
+        Returns:
+            array of shape (n, n_parameters)
+        """
+        if candidates is None:
+            candidates = latin_hypercube(n_candidates, self.bounds, seed)
+        candidates = np.atleast_2d(np.asarray(candidates, dtype=float))
+        x_candidates = self._normalise(candidates)
+
+        x, noise = self.x, self.noise
+        pending_noise = np.median(self.noise)
+        chosen = []
+        for _ in range(n):
+            chol = self._cholesky(x, noise)
+            v = solve_triangular(chol, self._kernel(x_candidates, x).T, lower=True)
+            var = np.exp(2 * self.log_amplitude) - np.sum(v**2, axis=0)
+            var[chosen] = -np.inf
+            best = int(np.argmax(var))
+            chosen.append(best)
+            x = np.vstack([x, x_candidates[best]])
+            noise = np.append(noise, pending_noise)
+
+        return candidates[chosen]
+
+    def fixed_parameters(self, fixed: dict = None) -> dict:
+        """Returns the values of the baby_model() arguments that are not
+        design parameters, the defaults updated with fixed.
+
+        Args:
+            fixed: dict {name: value} of non-design arguments
+
+        Returns:
+            dict {name: value}, without the arguments that only add tallies
+        """
+        from openmc_model import default_parameters
+
+        fixed = {**default_parameters(), **(fixed or {})}
+        for name in [*self.names, *TALLY_PARAMETERS]:
+            fixed.pop(name, None)
+        return fixed
+
+    def training_data(self, store, fixed: dict = None) -> tuple:
+        """Reads the design parameters and TBR of the runs of a results
+        store in one read. Only the runs whose other parameters match the
+        fixed ones are used, parameters not given to baby_model() take their
+        default values.
+
+        Args:
+            store: the ResultsStore
+            fixed: dict {name: value} of non-design arguments of baby_model()
+                (defaults to their default values)
+
+        Returns:
+            the design parameters, TBR and TBR standard deviations
+        """
+        from openmc_model import default_parameters
+
+        defaults = default_parameters()
+        fixed = self.fixed_parameters(fixed)
+        summary = store.summary()
+        params = [{**defaults, **json.loads(p)} for p in summary["params"]]
+        selected = np.array(
+            [all(p[name] == value for name, value in fixed.items()) for p in params],
+            dtype=bool,
+        ).reshape(len(summary))
+        x = np.array(
+            [
+                [p[name] for name in self.names]
+                for p, keep in zip(params, selected)
+                if keep
+            ],
+            dtype=float,
+        ).reshape(int(selected.sum()), len(self.names))
+        return x, summary["tbr"][selected], summary["tbr_std"][selected]
+
+    def fit_store(self, store, fixed: dict = None, **kwargs):
+        """Fits the surrogate to the runs of a results store.
+
+        Args:
+            store: the ResultsStore
+            fixed: dict {name: value} of non-design arguments of baby_model()
+                selecting the runs (see TBRSurrogate.training_data)
+            kwargs: passed to TBRSurrogate.fit
+
+        Returns:
+            the surrogate
+        """
+        return self.fit(*self.training_data(store, fixed), **kwargs)
+
+
+def active_learning(
+    store=None,
+    bounds: dict = DEFAULT_BOUNDS,
+    n_initial: int = 8,
+    n_iterations: int = 4,
+    batch_size: int = 4,
+    seed: int = 0,
+    um_tbr: bool = False,
+    fixed: dict = None,
+    **run_kwargs,
+) -> TBRSurrogate:
+    """Trains the surrogate by running baby_model() where it is the most
+    uncertain.
+
+    Runs already in the store are reused, so the loop can be interrupted and
+    resumed.
+
+    Args:
+        store: the ResultsStore (defaults to ResultsStore())
+        bounds: dict {name: (lower, upper)} of the design parameters
+        n_initial: number of runs of the initial latin hypercube design
+        n_iterations: number of active learning iterations
+        batch_size: number of runs per iteration
+        seed: seed of the random sampling
+        um_tbr: passed to baby_model(), off by default since the unstructured
+            mesh is built for the nominal ClLiF dimensions, not the sampled
+            ones
+        fixed: dict {name: value} of non-design arguments of baby_model()
+            (defaults to their default values), only the stored runs with
+            these values are used
+        run_kwargs: passed to results_store.run_cached (particles, batches...)
+
+    Returns:
+        the fitted surrogate
+    """
+    from results_store import ResultsStore, run_cached
+
+    store = store if store is not None else ResultsStore()
+    surrogate = TBRSurrogate(bounds)
+
+    def run(points):
+        for point in points:
+            params = {name: float(value) for name, value in zip(surrogate.names, point)}
+            params.update(fixed or {})
+            params["um_tbr"] = um_tbr
+            run_cached(store, params=params, **run_kwargs)
+
+    n_runs = len(surrogate.training_data(store, fixed)[0])
+    if n_runs < n_initial:
+        run(latin_hypercube(n_initial - n_runs, bounds, seed))
+
+    for iteration in range(n_iterations):
+        surrogate.fit_store(store, fixed, seed=seed + iteration)
+        run(surrogate.suggest(batch_size, seed=seed + iteration))
+
+    return surrogate.fit_store(store, fixed, seed=seed + n_iterations)
@@ -0,0 +1,190 @@
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import openmc
+import openmc.lib
+
+
+def resident_memory() -> int:
+    """Returns the resident memory of the current process (bytes)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # peak instead of current memory where /proc is not available
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Telemetry:
+    """Writes run events as JSON lines.
+
+    Args:
+        stream: path of the output file, or file-like object (defaults to
+            sys.stdout)
+    """
+
+    def __init__(self, stream=None):
+        self._owns_stream = isinstance(stream, (str, Path))
+        self.stream = open(stream, "a") if self._owns_stream else stream or sys.stdout
+        self.records = []
+
+    def emit(self, event: str, **fields) -> dict:
+        record = {"event": event, "time": time.time(), **fields}
+        self.records.append(record)
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+        return record
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a phase of the run and emits its duration and memory."""
+        start = time.perf_counter()
+        yield
+        self.emit(
+            "phase",
+            name=name,
+            seconds=time.perf_counter() - start,
+            rss=resident_memory(),
+        )
+
+    def close(self):
+        if self._owns_stream:
+            self.stream.close()
+
+
+def _tally_values(tally):
+    """Returns the mean and standard deviation of an openmc.lib tally, the
+    standard deviation is NaN until there are two realizations."""
+    mean = tally.mean
+    std_dev = (
+        tally.std_dev if tally.num_realizations > 1 else np.full_like(mean, np.nan)
+    )
+    return mean, std_dev
+
+
+def _json_float(value):
+    """Converts NaN and infinities to None, which are not valid JSON."""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def run_with_telemetry(
+    model,
+    telemetry: Telemetry = None,
+    cwd=".",
+    threads: int = None,
+    tbr_tally: str = "TBR",
+    mesh_tally: str = "UM_TBR",
+    output: bool = True,
+):
+    """Runs a model in memory with openmc.lib and streams, after each batch,
+    the throughput, elapsed and projected times, TBR mean and relative error,
+    worst relative error of the mesh tally elements and resident memory.
+
+    The export, cross sections loading, initialization (the rest of
+    openmc.lib.init and simulation_init), transport and finalization phases
+    are timed separately. The cross sections are loaded inside
+    openmc.lib.init, so their time is read from the statepoint and these two
+    phases are emitted at the end of the run.
+
+    Args:
+        model: the openmc model
+        telemetry: the Telemetry (defaults to Telemetry() writing to stdout)
+        cwd: directory where the model is exported and run
+        threads: number of OpenMP threads
+        tbr_tally: name of the TBR tally
+        mesh_tally: name of the mesh tally, its worst element error is
+            reported if it is in the model
+        output: if True, OpenMC prints its usual output
+
+    Returns:
+        the path of the statepoint and the list of telemetry records
+    """
+    telemetry = telemetry if telemetry is not None else Telemetry()
+    cwd = Path(cwd).resolve()
+    cwd.mkdir(parents=True, exist_ok=True)
+    settings = model.settings
+
+    with telemetry.phase("export"):
+        model.export_to_xml(cwd)
+    tally_ids = {tally.name: tally.id for tally in model.tallies}
+
+    args = [str(cwd)]
+    if threads is not None:
+        args = ["-s", str(threads)] + args
+
+    # OpenMC writes its output files in the working directory
+    previous_cwd = os.getcwd()
+    start = len(telemetry.records)
+    os.chdir(cwd)
+    try:
+        init_start = time.perf_counter()
+        openmc.lib.init(args=args, output=output)
+        openmc.lib.simulation_init()
+        initialization = time.perf_counter() - init_start
+        init_rss = resident_memory()
+
+        telemetry.emit("start", batches=settings.batches, particles=settings.particles)
+        transport_start = time.perf_counter()
+        batch_start = transport_start
+        for _ in openmc.lib.iter_batches():
+            now = time.perf_counter()
+            batch = openmc.lib.current_batch()
+            elapsed = now - transport_start
+            record = {
+                "batch": batch,
+                "particles_per_second": settings.particles / (now - batch_start),
+                "elapsed": elapsed,
+                "projected": elapsed / batch * settings.batches,
+                "rss": resident_memory(),
+            }
+
+            if tbr_tally in tally_ids:
+                tally = openmc.lib.tallies[tally_ids[tbr_tally]]
+                mean, std_dev = _tally_values(tally)
+                record["tbr"] = _json_float(mean.sum())
+                # summed standard deviations, as in postprocessing.ipynb
+                record["tbr_rel_err"] = _json_float(std_dev.sum() / mean.sum())
+
+            if mesh_tally in tally_ids:
+                tally = openmc.lib.tallies[tally_ids[mesh_tally]]
+                mean, std_dev = _tally_values(tally)
+                scored = mean > 0
+                if scored.any():
+                    rel_err = std_dev[scored] / mean[scored]
+                    record["mesh_max_rel_err"] = _json_float(np.max(rel_err))
+
+            telemetry.emit("batch", **record)
+            batch_start = time.perf_counter()
+
+        telemetry.emit(
+            "phase",
+            name="transport",
+            seconds=time.perf_counter() - transport_start,
+            rss=resident_memory(),
+        )
+
+        with telemetry.phase("finalization"):
+            openmc.lib.simulation_finalize()
+    finally:
+        openmc.lib.finalize()
+        os.chdir(previous_cwd)
+
+    statepoint = cwd / f"statepoint.{settings.batches}.h5"
+    with openmc.StatePoint(statepoint) as sp:
+        cross_sections = sp.runtime["reading cross sections"]
+    telemetry.emit("phase", name="cross_sections", seconds=cross_sections, rss=init_rss)
+    telemetry.emit(
+        "phase",
+        name="initialization",
+        seconds=initialization - cross_sections,
+        rss=init_rss,
+    )
+
+    return statepoint, telemetry.records[start:]
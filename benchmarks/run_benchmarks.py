@@ -0,0 +1,316 @@
+"""Performance benchmarks of the BABY model.
+
+Times baby_model() construction, XML export, cross sections loading, OpenMC
+initialization and transport for combinations of vault, UM_TBR tally and thread counts, the CSG
+against the DAGMC model of the BABY assembly, and the meshing time of
+mesh_creation.py against the number of elements. Every case
+runs in a fresh process so that its memory high-water mark is its own.
+
+The runs use a stand-in nuclear data library (see stand_in_data.py), so no
+download is needed. The mesh of the UM_TBR cases is generated with
+mesh_creation.py at the start of each run. Results are appended to
+history.jsonl and can be compared with a previous entry, a case that fails
+while it has metrics in that entry counts as a regression:
+
+    python run_benchmarks.py --baseline last
+"""
+
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [
+    str(ROOT / "analysis"),
+    str(ROOT / "unstructured_mesh"),
+    str(ROOT / "benchmarks"),
+]
+
+HISTORY_FILE = Path(__file__).parent / "history.jsonl"
+DATA_DIR = Path(__file__).parent / ".stand_in_data"
+
+# metrics compared with the baseline, True if higher is better
+METRICS = {
+    "construction": False,
+    "export": False,
+    "tessellation": False,
+    "cross_sections": False,
+    "initialization": False,
+    "particles_per_second": True,
+    "max_rss": False,
+    "meshing": False,
+}
+
+
+def _max_rss() -> int:
+    """Memory high-water mark of the process (bytes)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _prepare_data(data_dir) -> str:
+    """Generates the stand-in data for all the nuclides of the BABY model."""
+    import stand_in_data
+    from openmc_model import baby_model
+
+    model = baby_model(with_vault=True, um_tbr=False, detector_tallies=True)
+    return str(stand_in_data.generate(data_dir, stand_in_data.model_nuclides(model)))
+
+
+def _prepare_mesh(mesh_dir) -> str:
+    """Generates the UM_TBR mesh with mesh_creation.py."""
+    from mesh_creation import create_mesh
+
+    filename = Path(mesh_dir) / "baby"
+    create_mesh(filename=str(filename), gui=False, verbose=False)
+    return str(filename.with_suffix(".vtk"))
+
+
+def _model_case(
+    cross_sections,
+    with_vault,
+    um_tbr,
+    threads,
+    particles,
+    batches,
+    dagmc=False,
+    um_tbr_mesh=None,
+):
+    """Times the construction, export, cross sections loading,
+    initialization and transport of the model. With dagmc, the tessellation
+    of the DAGMC file is timed on its own, in an empty cache, and not in the
+    construction."""
+    import openmc
+
+    os.environ["OPENMC_CROSS_SECTIONS"] = cross_sections
+    openmc.config["cross_sections"] = cross_sections
+    import openmc_model
+    from openmc_model import baby_model
+    from telemetry import Telemetry, run_with_telemetry
+
+    if um_tbr:
+        if um_tbr_mesh is None:
+            raise FileNotFoundError("the UM_TBR mesh could not be generated")
+        openmc_model.UM_TBR_MESH = Path(um_tbr_mesh)
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        if dagmc:
+            import cad_geometry
+
+            cad_geometry.CACHE_DIR = Path(tmp) / "dagmc"
+            start = time.perf_counter()
+            baby_model(with_vault=False, um_tbr=False, dagmc=True)
+            metrics["tessellation"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = baby_model(with_vault=with_vault, um_tbr=um_tbr, dagmc=dagmc)
+        construction = time.perf_counter() - start
+
+        # the stand-in library has no thermal scattering data
+        for material in model.geometry.get_all_materials().values():
+            material._sab = []
+        model.settings.particles = particles
+        model.settings.batches = batches
+
+        _, records = run_with_telemetry(
+            model, Telemetry(io.StringIO()), cwd=tmp, threads=threads, output=False
+        )
+    phases = {r["name"]: r["seconds"] for r in records if r["event"] == "phase"}
+
+    return {
+        **metrics,
+        "construction": construction,
+        "export": phases["export"],
+        "cross_sections": phases["cross_sections"],
+        "initialization": phases["initialization"],
+        "transport": phases["transport"],
+        "particles_per_second": particles * batches / phases["transport"],
+        "max_rss": _max_rss(),
+    }
+
+
+def _mesh_case(scale):
+    """Times mesh_creation.py with all the mesh sizes multiplied by scale."""
+    from mesh_creation import create_mesh
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        n_elements = create_mesh(
+            inner_mesh_size=0.2 * scale,
+            outer_mesh_size=2.0 * scale,
+            bottom_mesh_size=0.5 * scale,
+            filename=str(Path(tmp) / "baby"),
+            gui=False,
+            verbose=False,
+        )
+        meshing = time.perf_counter() - start
+
+    return {"elements": n_elements, "meshing": meshing, "max_rss": _max_rss()}
+
+
+def _in_subprocess(function, *args):
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def run_benchmarks(
+    threads=(1, 2, 4), particles=1000, batches=5, mesh_scales=(2.0, 1.0, 0.5)
+) -> list:
+    """Runs all the benchmark cases.
+
+    Args:
+        threads: thread counts of the transport cases
+        particles: number of particles per batch
+        batches: number of batches
+        mesh_scales: factors applied to the mesh sizes of mesh_creation.py
+
+    Returns:
+        list of dicts with the case name and its metrics (or error)
+    """
+    cross_sections = _in_subprocess(_prepare_data, str(DATA_DIR))
+
+    # the UM_TBR cases need the mesh of mesh_creation.py, generated for each
+    # run so that it follows the current BABY dimensions
+    with tempfile.TemporaryDirectory() as mesh_dir:
+        try:
+            um_tbr_mesh = _in_subprocess(_prepare_mesh, mesh_dir)
+        except Exception as error:
+            print(f"UM_TBR mesh generation failed: {type(error).__name__}: {error}")
+            um_tbr_mesh = None
+
+        cases = []
+        for with_vault, um_tbr, n_threads in itertools.product(
+            [True, False], [False, True], threads
+        ):
+            name = f"model[vault={with_vault},um_tbr={um_tbr},threads={n_threads}]"
+            args = (cross_sections, with_vault, um_tbr, n_threads, particles, batches)
+            cases.append((name, _model_case, args + (False, um_tbr_mesh)))
+        # the DAGMC model only replaces the BABY assembly, compare it with the
+        # CSG cases of the same vault and tallies
+        for n_threads in threads:
+            name = f"model[vault=True,um_tbr=False,dagmc=True,threads={n_threads}]"
+            args = (cross_sections, True, False, n_threads, particles, batches, True)
+            cases.append((name, _model_case, args))
+        for scale in mesh_scales:
+            cases.append((f"mesh[scale={scale}]", _mesh_case, (scale,)))
+
+        results = []
+        for name, function, args in cases:
+            try:
+                result = {"case": name, **_in_subprocess(function, *args)}
+            except Exception as error:
+                result = {"case": name, "error": f"{type(error).__name__}: {error}"}
+            print(json.dumps(result))
+            results.append(result)
+    return results
+
+
+def load_history() -> list:
+    if not HISTORY_FILE.exists():
+        return []
+    with open(HISTORY_FILE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_history(results: list):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    entry = {
+        "timestamp": time.time(),
+        "commit": commit,
+        "host": platform.node(),
+        "results": results,
+    }
+    with open(HISTORY_FILE, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def compare(results: list, baseline: dict, tolerance: float = 0.1) -> list:
+    """Compares results with a baseline history entry.
+
+    Args:
+        results: the benchmark results
+        baseline: a history entry
+        tolerance: relative change above which a metric is a regression
+
+    Returns:
+        list of (case, metric, baseline value, new value) regressions, a
+        case that fails while it has metrics in the baseline is reported
+        with the metric "error" and the error message as new value
+    """
+    baseline_results = {r["case"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(result["case"], {})
+        if "error" in result:
+            if any(metric in reference for metric in METRICS):
+                regressions.append((result["case"], "error", None, result["error"]))
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in result or metric not in reference:
+                continue
+            change = (result[metric] - reference[metric]) / reference[metric]
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(
+                    (result["case"], metric, reference[metric], result[metric])
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the BABY model")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--particles", type=int, default=1000)
+    parser.add_argument("--batches", type=int, default=5)
+    parser.add_argument("--mesh-scales", type=float, nargs="+", default=[2.0, 1.0, 0.5])
+    parser.add_argument(
+        "--baseline",
+        help="history entry to compare with: 'last' or a git commit hash",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument(
+        "--no-history", action="store_true", help="do not append to history.jsonl"
+    )
+    args = parser.parse_args()
+
+    history = load_history()
+    results = run_benchmarks(
+        args.threads, args.particles, args.batches, args.mesh_scales
+    )
+    if not args.no_history:
+        save_history(results)
+
+    if args.baseline:
+        if args.baseline == "last":
+            candidates = history[-1:]
+        else:
+            candidates = [
+                e for e in history if (e["commit"] or "").startswith(args.baseline)
+            ]
+        if not candidates:
+            raise SystemExit(f"No history entry matches {args.baseline}")
+
+        regressions = compare(results, candidates[-1], args.tolerance)
+        for case, metric, before, after in regressions:
+            if metric == "error":
+                print(f"REGRESSION {case} failed: {after}")
+            else:
+                print(f"REGRESSION {case} {metric}: {before:.4g} -> {after:.4g}")
+        if regressions:
+            raise SystemExit(1)
+        print("No regression compared with the baseline.")
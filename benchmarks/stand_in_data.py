@@ -0,0 +1,100 @@
+"""Generates a small nuclear data library standing in for the real one, so
+that the benchmarks run offline. The cross sections are smooth analytical
+functions: the timings are representative of the geometry and tallies, not
+of the physics."""
+
+from pathlib import Path
+
+import numpy as np
+import openmc
+import openmc.data
+
+TEMPERATURE = 294.0  # K
+
+# tritium production cross sections (b) of the lithium isotopes, as
+# functions of the energy (eV)
+TRITIUM_PRODUCTION = {
+    "Li6": lambda energy: np.minimum(940.0 * np.sqrt(0.0253 / energy), 1e4),
+    "Li7": lambda energy: np.where(energy > 2.8e6, 0.3, 0.0),
+}
+
+
+def stand_in_nuclide(name: str, n_energies: int = 500) -> openmc.data.IncidentNeutron:
+    """Builds the data of a nuclide with isotropic elastic scattering,
+    a 1/v capture and, for lithium, a tritium production cross section.
+
+    Args:
+        name: name of the nuclide, for instance "Li6"
+        n_energies: number of points of the energy grid
+
+    Returns:
+        the nuclide data
+    """
+    z, a, m = openmc.data.zam(name)
+    awr = openmc.data.atomic_mass(name) / openmc.data.NEUTRON_MASS
+    temperature = f"{round(TEMPERATURE)}K"
+    data = openmc.data.IncidentNeutron(
+        name, z, a, m, awr, [openmc.data.K_BOLTZMANN * TEMPERATURE]
+    )
+    energy = np.logspace(-5, np.log10(20e6), n_energies)
+    data.energy[temperature] = energy
+
+    isotropic = openmc.data.AngleDistribution(
+        [energy[0], energy[-1]], [openmc.stats.Uniform(-1, 1)] * 2
+    )
+    elastic = openmc.data.Reaction(2)
+    elastic.center_of_mass = True
+    elastic.xs[temperature] = openmc.data.Tabulated1D(energy, np.full_like(energy, 4.0))
+    neutron = openmc.data.Product("neutron")
+    neutron.distribution = [openmc.data.UncorrelatedAngleEnergy(isotropic)]
+    elastic.products.append(neutron)
+    data.reactions[2] = elastic
+
+    capture = openmc.data.Reaction(102)
+    capture.xs[temperature] = openmc.data.Tabulated1D(
+        energy, 0.1 * np.sqrt(0.0253 / energy)
+    )
+    data.reactions[102] = capture
+
+    if name in TRITIUM_PRODUCTION:
+        tritium = openmc.data.Reaction(205)
+        tritium.redundant = True
+        tritium.xs[temperature] = openmc.data.Tabulated1D(
+            energy, TRITIUM_PRODUCTION[name](energy)
+        )
+        data.reactions[205] = tritium
+
+    return data
+
+
+def generate(directory, nuclides: list) -> Path:
+    """Writes the stand-in data of a list of nuclides and its
+    cross_sections.xml, nuclides already in the directory are reused.
+
+    Args:
+        directory: output directory
+        nuclides: list of nuclide names
+
+    Returns:
+        the path of cross_sections.xml
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    library = openmc.data.DataLibrary()
+    for name in sorted(set(nuclides)):
+        filename = directory / f"{name}.h5"
+        if not filename.exists():
+            stand_in_nuclide(name).export_to_hdf5(filename, "w")
+        library.register_file(filename)
+
+    cross_sections = directory / "cross_sections.xml"
+    library.export_to_xml(cross_sections)
+    return cross_sections
+
+
+def model_nuclides(model) -> list:
+    """Returns the nuclides of all the materials of a model."""
+    materials = model.geometry.get_all_materials().values()
+    return sorted(
+        {nuclide for material in materials for nuclide in material.get_nuclides()}
+    )
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# the analysis scripts import each other as top-level modules
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "analysis"), str(ROOT / "benchmarks")]
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from detector_response import C12_MASS_RATIO, C12_N_ALPHA_Q, DiamondResponse
+
+
+@pytest.fixture(scope="module")
+def response():
+    # channels wide enough to contain the broadened deposits of every bin
+    return DiamondResponse(
+        energy_bins=np.linspace(0.0, 16.0e6, 33),
+        channel_edges=np.linspace(-2.0e6, 20.0e6, 441),
+    )
+
+
+def test_elastic_response_normalised(response):
+    assert np.allclose(response.elastic_matrix.sum(axis=0), 1.0, atol=1e-6)
+
+
+def test_n_alpha_response_normalised_above_threshold(response):
+    totals = response.n_alpha_matrix.sum(axis=0)
+    low = response.energy_bins[:-1]
+    high = response.energy_bins[1:]
+    threshold = -C12_N_ALPHA_Q * (C12_MASS_RATIO + 1) / C12_MASS_RATIO
+    assert np.allclose(totals[low > threshold], 1.0, atol=1e-6)
+    assert np.allclose(totals[high < threshold], 0.0)
+
+
+def test_elastic_recoils_below_maximum(response):
+    # 14 MeV neutrons give recoils up to about 4 MeV
+    column = response.elastic_matrix[:, np.searchsorted(response.energy_bins, 14e6)]
+    assert column[response.channels > 5e6].sum() < 1e-6
+
+
+def test_fold_is_linear(response):
+    n_energies = len(response.energy_bins) - 1
+    elastic = np.zeros(n_energies)
+    elastic[20] = 2.0
+    n_alpha = np.zeros(n_energies)
+    n_alpha[25] = 0.5
+    counts = response.fold(elastic, n_alpha, source_rate=10.0)
+    expected = 10.0 * (
+        2.0 * response.elastic_matrix[:, 20] + 0.5 * response.n_alpha_matrix[:, 25]
+    )
+    assert np.allclose(counts, expected)
+
+    # batches are folded along the last axis
+    batches = response.fold(np.stack([elastic, 2 * elastic]), np.zeros((2, n_energies)))
+    assert np.allclose(batches[1], 2 * batches[0])
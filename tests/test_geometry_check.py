@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+openmc = pytest.importorskip("openmc")
+
+from geometry_check import _check_points, evaluate_surface, region_contains
+from helpers import geometry_hash
+
+
+@pytest.fixture
+def points():
+    return np.array([[0.0, 0.0, 0.0], [1.5, 0.0, 0.0], [3.0, 0.0, 0.0]])
+
+
+def test_evaluate_surface_plane(points):
+    plane = openmc.XPlane(1.0)
+    assert np.allclose(evaluate_surface(plane, points), [-1.0, 0.5, 2.0])
+
+
+def test_evaluate_surface_quadric(points):
+    sphere = openmc.Sphere(r=2.0)
+    assert np.allclose(evaluate_surface(sphere, points), [-4.0, -1.75, 5.0])
+
+
+def test_evaluate_surface_matches_scalar_evaluation(points):
+    cylinder = openmc.ZCylinder(x0=1.0, y0=0.5, r=1.2)
+    expected = [cylinder.evaluate(point) for point in points]
+    assert np.allclose(evaluate_surface(cylinder, points), expected)
+
+
+def test_region_contains(points):
+    sphere = openmc.Sphere(r=2.0)
+    plane = openmc.XPlane(1.0)
+    assert region_contains(-sphere, points).tolist() == [True, True, False]
+    assert region_contains(~(-sphere), points).tolist() == [False, False, True]
+    assert region_contains(-sphere & +plane, points).tolist() == [False, True, False]
+    assert region_contains(-sphere | +plane, points).tolist() == [True, True, True]
+    assert region_contains(None, points).all()
+
+
+def test_check_points_overlap_and_undefined(points):
+    sphere = openmc.Sphere(r=2.0)
+    plane = openmc.XPlane(1.0)
+    inner = openmc.Cell(region=-sphere)
+    # overlaps the sphere for 1 < x < 2 and leaves x > 2 undefined
+    slab = openmc.Cell(region=+plane & -openmc.XPlane(2.0))
+    overlaps, undefined = _check_points([inner, slab], points)
+    assert overlaps == [([1.5, 0.0, 0.0], [inner.id, slab.id])]
+    assert undefined == [[3.0, 0.0, 0.0]]
+
+
+def test_geometry_hash_independent_of_ids():
+    def cells():
+        material = openmc.Material(name="iron")
+        material.add_nuclide("Fe56", 1.0)
+        material.set_density("g/cm3", 7.8)
+        sphere = openmc.Sphere(r=2.0)
+        return [
+            openmc.Cell(region=-sphere, fill=material),
+            openmc.Cell(region=+sphere & -openmc.Sphere(r=3.0)),
+        ]
+
+    first, second = cells(), cells()
+    assert first[0].id != second[0].id
+    assert geometry_hash(first) == geometry_hash(second)
+
+    second[1].region = +openmc.Sphere(r=2.0) & -openmc.Sphere(r=3.5)
+    assert geometry_hash(first) != geometry_hash(second)
+
+
+def test_geometry_hash_resolves_vault_coordinates():
+    def cells(r):
+        return [openmc.Cell(region=-openmc.ZCylinder(x0=587.0, y0=60.0, r=r))]
+
+    assert geometry_hash(cells(7.0)) != geometry_hash(cells(7.0003))
+
+
+def test_geometry_hash_includes_transformation():
+    def cell():
+        return openmc.Cell(region=-openmc.Sphere(r=2.0), fill=openmc.Universe())
+
+    translated, rotated, reference = cell(), cell(), cell()
+    translated.translation = (587.0, 60.0, 100.0)
+    rotated.rotation = (0.0, 0.0, 90.0)
+    hashes = {geometry_hash([c]) for c in [translated, rotated, reference]}
+    assert len(hashes) == 3
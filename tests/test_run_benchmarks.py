@@ -0,0 +1,30 @@
+from run_benchmarks import compare
+
+BASELINE = {
+    "results": [
+        {"case": "csg", "construction": 1.0, "particles_per_second": 1000.0},
+        {"case": "dagmc", "error": "no DAGMC"},
+    ]
+}
+
+
+def test_compare_slower_and_faster():
+    results = [{"case": "csg", "construction": 1.2, "particles_per_second": 1200.0}]
+    assert compare(results, BASELINE) == [("csg", "construction", 1.0, 1.2)]
+    results = [{"case": "csg", "construction": 0.8, "particles_per_second": 800.0}]
+    assert compare(results, BASELINE) == [
+        ("csg", "particles_per_second", 1000.0, 800.0)
+    ]
+
+
+def test_compare_within_tolerance():
+    results = [{"case": "csg", "construction": 1.05, "particles_per_second": 950.0}]
+    assert compare(results, BASELINE) == []
+
+
+def test_compare_failing_case():
+    results = [{"case": "csg", "error": "crash"}]
+    assert compare(results, BASELINE) == [("csg", "error", None, "crash")]
+    # failing in the baseline too or new cases are not regressions
+    results = [{"case": "dagmc", "error": "no DAGMC"}, {"case": "new", "error": "x"}]
+    assert compare(results, BASELINE) == []
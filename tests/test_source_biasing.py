@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+openmc = pytest.importorskip("openmc")
+
+from source_biasing import TWO_PI, _complement, _merge, stratify_source, target_windows
+
+
+def test_merge_overlapping_intervals():
+    assert _merge([(1.0, 2.0), (1.5, 3.0), (4.0, 5.0)]) == [(1.0, 3.0), (4.0, 5.0)]
+
+
+def test_merge_wraps_around():
+    merged = _merge([(-0.5, 0.5)])
+    assert np.allclose(merged, [(0.0, 0.5), (TWO_PI - 0.5, TWO_PI)])
+    assert _merge([(0.0, 7.0)]) == [(0.0, TWO_PI)]
+
+
+def test_complement():
+    assert _complement([(1.0, 2.0), (3.0, 4.0)]) == [
+        (0.0, 1.0),
+        (2.0, 3.0),
+        (4.0, TWO_PI),
+    ]
+    assert _complement([]) == [(0.0, TWO_PI)]
+    assert _complement([(0.0, TWO_PI)]) == []
+
+
+def test_target_windows_contain_target():
+    origin = np.zeros(3)
+    u = np.array([0.0, 0.0, 1.0])
+    target = (np.array([10.0, 0.0, 0.0]), 1.0)
+    windows = target_windows(origin, u, (-1.0, 1.0), [target])
+    assert len(windows) == 1
+    # the half-angle of the target seen from the origin
+    half_width = np.arcsin(0.1)
+    width = sum(high - low for low, high in windows)
+    assert width == pytest.approx(2 * half_width, rel=1e-3)
+
+
+def test_target_windows_enclosing_target():
+    windows = target_windows(np.zeros(3), [0, 0, 1], (-1, 1), [(np.zeros(3), 1.0)])
+    assert windows == [(0.0, TWO_PI)]
+
+
+def test_target_windows_out_of_reach():
+    # the ring only covers upward directions, the target is below
+    windows = target_windows(
+        np.zeros(3), [0, 0, 1], (0.5, 1.0), [(np.array([0.0, 0.0, -10.0]), 1.0)]
+    )
+    assert windows == []
+
+
+def test_stratify_source_strengths():
+    source = openmc.IndependentSource(space=openmc.stats.Point((0, 0, 0)), strength=2.0)
+    targets = [(np.array([10.0, 0.0, 0.0]), 1.0)]
+    target, rest, p_target = stratify_source([source], targets)
+    assert target and rest
+    total = sum(s.strength for s in target) + sum(s.strength for s in rest)
+    assert total == pytest.approx(2.0)
+    assert p_target == pytest.approx(sum(s.strength for s in target) / 2.0)
+
+
+@pytest.mark.parametrize("source_bias", ["target", "rest"])
+def test_dagmc_strata_match_csg(monkeypatch, source_bias):
+    pytest.importorskip("libra_toolbox")
+    import cad_geometry
+    import openmc_model
+
+    # the DAGMC file is not read when the model is built
+    monkeypatch.setattr(cad_geometry, "dagmc_file", lambda *args, **kwargs: "baby.h5m")
+
+    def strata(dagmc):
+        model = openmc_model.baby_model(
+            source_offset=8.0,
+            source_bias=source_bias,
+            with_vault=False,
+            um_tbr=False,
+            dagmc=dagmc,
+        )
+        return [
+            (source.angle.phi.a, source.angle.phi.b, source.strength)
+            for source in model.settings.source
+        ]
+
+    assert np.allclose(strata(dagmc=True), strata(dagmc=False))
@@ -0,0 +1,114 @@
+import json
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from surrogate import DEFAULT_BOUNDS, TBRSurrogate, latin_hypercube
+
+BOUNDS = {"a": (0.0, 1.0), "b": (10.0, 20.0)}
+
+
+def tbr(x):
+    return 1.0 + 0.3 * np.sin(3 * x[:, 0]) + 0.02 * (x[:, 1] - 15.0)
+
+
+def test_latin_hypercube_strata():
+    n = 20
+    x = latin_hypercube(n, BOUNDS, seed=1)
+    assert x.shape == (n, 2)
+    for i, (lower, upper) in enumerate(BOUNDS.values()):
+        strata = np.floor((x[:, i] - lower) / (upper - lower) * n)
+        assert sorted(strata) == list(range(n))
+
+
+def test_fit_interpolates_training_runs():
+    x = latin_hypercube(30, BOUNDS, seed=0)
+    surrogate = TBRSurrogate(BOUNDS).fit(x, tbr(x), np.full(len(x), 1e-4))
+    mean, std = surrogate.predict(x)
+    assert np.allclose(mean, tbr(x), atol=1e-3)
+    assert np.all(std < 1e-2)
+
+
+def test_predict_between_runs():
+    x = latin_hypercube(40, BOUNDS, seed=0)
+    surrogate = TBRSurrogate(BOUNDS).fit(x, tbr(x), np.full(len(x), 1e-4))
+    test_x = latin_hypercube(10, BOUNDS, seed=2)
+    mean, std = surrogate.predict(test_x)
+    assert np.allclose(mean, tbr(test_x), atol=0.02)
+    # the uncertainty grows away from the runs
+    _, far_std = surrogate.predict([[3.0, 40.0]])
+    assert far_std[0] > std.max()
+
+
+def test_fit_needs_two_runs():
+    with pytest.raises(ValueError):
+        TBRSurrogate(BOUNDS).fit([[0.5, 15.0]], [1.0], [0.01])
+
+
+def test_suggest_within_bounds():
+    x = latin_hypercube(10, DEFAULT_BOUNDS, seed=0)
+    y = 1.0 + 0.1 * x[:, 0]
+    surrogate = TBRSurrogate().fit(x, y, np.full(len(x), 1e-3))
+    suggested = surrogate.suggest(3, n_candidates=256)
+    assert suggested.shape == (3, len(DEFAULT_BOUNDS))
+    assert len(np.unique(suggested, axis=0)) == 3
+    assert np.all(suggested >= surrogate.lower)
+    assert np.all(suggested <= surrogate.upper)
+
+
+class FakeStore:
+    def __init__(self, runs):
+        self.runs = runs
+
+    def summary(self):
+        summary = np.zeros(
+            len(self.runs),
+            dtype=[("params", object), ("tbr", float), ("tbr_std", float)],
+        )
+        for row, (params, value) in zip(summary, self.runs):
+            row["params"] = json.dumps(params)
+            row["tbr"] = value
+            row["tbr_std"] = 0.01
+        return summary
+
+
+@pytest.fixture
+def defaults(monkeypatch):
+    # the training runs are selected against the baby_model() defaults
+    defaults = {
+        "a": 0.5,
+        "b": 15.0,
+        "with_vault": True,
+        "source_offset": 5.635,
+        "um_tbr": True,
+    }
+    module = types.SimpleNamespace(default_parameters=lambda: dict(defaults))
+    monkeypatch.setitem(sys.modules, "openmc_model", module)
+    return defaults
+
+
+def test_training_data_selects_matching_runs(defaults):
+    store = FakeStore(
+        [
+            ({"a": 0.1, "um_tbr": False}, 1.0),
+            ({"a": 0.2, "b": 12.0}, 2.0),
+            ({"a": 0.3, "with_vault": False}, 3.0),
+            ({"a": 0.4, "source_offset": 7.0}, 4.0),
+        ]
+    )
+    x, tbr, tbr_std = TBRSurrogate(BOUNDS).training_data(store)
+    assert x.tolist() == [[0.1, 15.0], [0.2, 12.0]]
+    assert tbr.tolist() == [1.0, 2.0]
+    assert len(tbr_std) == 2
+
+    x, tbr, _ = TBRSurrogate(BOUNDS).training_data(store, fixed={"source_offset": 7.0})
+    assert x.tolist() == [[0.4, 15.0]]
+    assert tbr.tolist() == [4.0]
+
+
+def test_training_data_empty_store(defaults):
+    x, tbr, _ = TBRSurrogate(BOUNDS).training_data(FakeStore([]))
+    assert x.shape == (0, 2)
+    assert len(tbr) == 0